@@ -0,0 +1,75 @@
+# ai/advice_generator.py
+
+import re
+
+from ai import llm_client
+from ai.routine_recommendor import fallback_routine_tip
+from ai.tips_generator import fallback_tips
+
+# A marker starts a line; anything after it on that line is the section's first item
+SECTION_PATTERN = re.compile(r"^[ \t]*(ROUTINE|TIPS)[ \t]*:", re.IGNORECASE | re.MULTILINE)
+
+
+def _section_lines(text):
+    lines = [re.sub(r"^(\d+[.)]|[•*-])\s*", "", line.strip()).strip() for line in text.split("\n")]
+    return [line for line in lines if len(line) > 10]
+
+
+def parse_advice(output):
+    # Splits "ROUTINE:\n...\nTIPS:\n..." into its two lists; a missing section comes back empty
+    sections = {"routine": [], "tips": []}
+    markers = list(SECTION_PATTERN.finditer(output))
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(output)
+        sections[marker.group(1).lower()] = _section_lines(output[marker.end():end])
+    return sections["routine"][:3], sections["tips"][:3]
+
+
+def generate_tips_and_routine(data):
+    """One LLM call for both the routine improvements and the personalised tips on /log.
+
+    Returns (routine, tips) in the same shapes as generate_custom_routine_tip and
+    generate_tips; whichever part cannot be parsed falls back to its rule-based version.
+    """
+    journal = data.get("journal", "").lower()
+    sentiment = data.get("sentiment", {})
+
+    prompt = (
+        "You are a highly analytical sleep wellness expert and an empathetic sleep coach.\n"
+        "1. Evaluate the user's routine and suggest exactly 3 improvements. ONLY address suboptimal habits.\n"
+        "2. Given the user's current state, give exactly 3 personalized sleep tips. "
+        "Mention nightmares or stress if applicable.\n"
+        "No praise, no summaries. Reply in exactly this format:\n"
+        "ROUTINE:\n- improvement\n- improvement\n- improvement\n"
+        "TIPS:\n- tip\n- tip\n- tip\n\n"
+        "User Data:\n"
+        f"- Wake-up time: {data.get('wakeUp', '')}\n"
+        f"- Hours slept: {data.get('hours_slept', 0)}\n"
+        f"- Screen time duration: {data.get('screen_time', 0)}\n"
+        f"- Screen time after 9PM (in hours): {data.get('screenTime', '')}\n"
+        f"- Caffeine intake (cups): {data.get('caffeine', 0)}\n"
+        f"- Last caffeine intake time: {data.get('caffeineTime', '')}\n"
+        f"- Workout time: {data.get('workoutTime', '')}\n"
+        f"- Heavy meal close to bedtime: {data.get('lateMeal', '')}\n"
+        f"- Mood: {data.get('mood', 'neutral').lower()}\n"
+        f"- Emotion: {data.get('emotion', 'unknown').lower()}\n"
+        f"- Sentiment: {sentiment.get('mood', 'unknown').lower()} (Polarity: {sentiment.get('polarity', 0.0)})\n"
+        f"- Journal: \"{journal}\"\n\n"
+    )
+
+    routine, tips = [], []
+    try:
+        output = llm_client.generate(prompt, {
+            "max_new_tokens": 450,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "return_full_text": False
+        })
+        if output.startswith(prompt):
+            output = output[len(prompt):]
+        routine, tips = parse_advice(output)
+    except Exception as e:
+        print("⚠️ Combined advice generation failed:", e)
+
+    routine_text = "\n".join(routine) if routine else fallback_routine_tip(data)
+    return routine_text, tips or fallback_tips(data)
@@ -0,0 +1,70 @@
+# ai/batching.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+
+class MicroBatcher:
+    """Groups single-item calls from many request threads into one batched model call.
+
+    Items wait at most `max_latency_ms` for others to join; `batch_fn(items)` must
+    return one result per item in the same order.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=16, max_latency_ms=5):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+
+    def submit(self, item):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                metrics.observe(f"{self.name}.queue_wait", started - enqueued)
+            try:
+                results = self.batch_fn(items)
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            metrics.observe(f"{self.name}.batch_latency", time.perf_counter() - started)
+            metrics.incr(f"{self.name}.batches")
+            metrics.incr(f"{self.name}.items", len(items))
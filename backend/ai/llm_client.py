@@ -0,0 +1,227 @@
+# ai/llm_client.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+import metrics
+from ai.llm_providers import create_provider
+
+load_dotenv()
+HF_TOKEN = os.getenv("HF_API_TOKEN")
+
+REQUEST_TIMEOUT_SECONDS = 45
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+# After this many consecutive failures, calls fail fast for BREAKER_RESET_SECONDS
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+
+class LLMUnavailable(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold, reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            # Half-open: once the cool-down has passed, let a single trial call through
+            if time.monotonic() - self._opened_at >= self.reset_seconds and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"⚠️ {self.name} circuit opened after {self._failures} failures")
+                    metrics.incr(f"{self.name}.circuit_opened")
+                self._opened_at = time.monotonic()
+
+    def state(self):
+        with self._lock:
+            return "open" if self._opened_at is not None else "closed"
+
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE))
+
+_provider = create_provider(_session, HF_TOKEN, REQUEST_TIMEOUT_SECONDS)
+_breaker = CircuitBreaker("llm", BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+_cache = OrderedDict()          # key -> (expires_at, text)
+_in_flight = {}                 # key -> Future shared by identical concurrent prompts
+_lock = threading.Lock()
+
+
+def _normalize(prompt):
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+def _cache_key(prompt, parameters):
+    raw = json.dumps([_normalize(prompt), parameters], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cached(key):
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry[1]
+
+
+def _store(key, text):
+    _cache[key] = (time.monotonic() + CACHE_TTL_SECONDS, text)
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _admit():
+    if not _breaker.allow():
+        metrics.incr("llm.short_circuited")
+        raise LLMUnavailable("LLM endpoint is degraded, circuit open")
+
+
+def _call_provider(prompt, parameters):
+    _admit()
+    started = time.perf_counter()
+    try:
+        text = _provider.generate(prompt, parameters)
+    except Exception:
+        _breaker.record_failure()
+        metrics.incr("llm.errors")
+        raise
+    finally:
+        metrics.observe("llm.request", time.perf_counter() - started)
+    _breaker.record_success()
+    return text
+
+
+async def _call_provider_async(prompt, parameters):
+    _admit()
+    started = time.perf_counter()
+    try:
+        text = await _provider.generate_async(prompt, parameters)
+    except Exception:
+        _breaker.record_failure()
+        metrics.incr("llm.errors")
+        raise
+    finally:
+        metrics.observe("llm.request", time.perf_counter() - started)
+    _breaker.record_success()
+    return text
+
+
+def _claim(key):
+    # Returns (cached_text, future, leader); only the leader calls the provider for a key
+    with _lock:
+        text = _cached(key)
+        if text is not None:
+            metrics.incr("llm.cache_hit")
+            return text, None, False
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if leader:
+        metrics.incr("llm.cache_miss")
+    else:
+        metrics.incr("llm.coalesced")
+    return None, future, leader
+
+
+def _settle(key, future, text=None, error=None):
+    with _lock:
+        if error is None:
+            _store(key, text)
+        _in_flight.pop(key, None)
+    if error is None:
+        future.set_result(text)
+    else:
+        future.set_exception(error)
+
+
+def generate(prompt, parameters):
+    """Return the generated text for `prompt`, served from cache when possible.
+
+    Identical prompts that arrive while one is already in flight wait for that call
+    instead of issuing their own. Raises LLMUnavailable or the request error on failure.
+    """
+    key = _cache_key(prompt, parameters)
+    text, future, leader = _claim(key)
+    if text is not None:
+        return text
+    if not leader:
+        return future.result(timeout=REQUEST_TIMEOUT_SECONDS + 5)
+
+    try:
+        text = _call_provider(prompt, parameters)
+    except Exception as e:
+        _settle(key, future, error=e)
+        raise
+    _settle(key, future, text)
+    return text
+
+
+async def generate_async(prompt, parameters):
+    # Same as generate() for the ASGI app; the cache, in-flight calls and breaker are shared
+    key = _cache_key(prompt, parameters)
+    text, future, leader = _claim(key)
+    if text is not None:
+        return text
+    if not leader:
+        # shield: a timed-out waiter must not cancel the future other callers share
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                      REQUEST_TIMEOUT_SECONDS + 5)
+
+    try:
+        text = await _call_provider_async(prompt, parameters)
+    except Exception as e:
+        _settle(key, future, error=e)
+        raise
+    except asyncio.CancelledError:
+        # The client went away; release anyone waiting on this prompt
+        _settle(key, future, error=LLMUnavailable("LLM call was cancelled"))
+        raise
+    _settle(key, future, text)
+    return text
+
+
+def breaker_state():
+    return _breaker.state()
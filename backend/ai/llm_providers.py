@@ -0,0 +1,81 @@
+# ai/llm_providers.py
+
+import asyncio
+import os
+
+from model_registry import registry
+
+# LLM_PROVIDER:
+#   hf    - Hugging Face inference API, or anything speaking it (see ai/mock_llm_server.py) (default)
+#   local - a transformers model on this machine's CPU, no network needed
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "hf")
+LLM_API_URL = os.getenv("LLM_API_URL", "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta")
+LLM_LOCAL_MODEL = os.getenv("LLM_LOCAL_MODEL", "google/flan-t5-base")
+LLM_LOCAL_TASK = os.getenv("LLM_LOCAL_TASK", "text2text-generation")
+# Connection cap for the async client used by the ASGI app (see async_app.py)
+LLM_ASYNC_MAX_CONNECTIONS = int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", "100"))
+
+
+class HFInferenceProvider:
+    def __init__(self, session, url, token, timeout):
+        self.session = session
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.timeout = timeout
+        self._async_client = None
+
+    def generate(self, prompt, parameters):
+        resp = self.session.post(self.url, headers=self.headers, timeout=self.timeout,
+                                 json={"inputs": prompt, "parameters": parameters})
+        resp.raise_for_status()
+        return resp.json()[0]["generated_text"]
+
+    async def generate_async(self, prompt, parameters):
+        if self._async_client is None:
+            # Created on first use so it binds to the serving event loop
+            import httpx
+            self._async_client = httpx.AsyncClient(
+                headers=self.headers, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=LLM_ASYNC_MAX_CONNECTIONS))
+        resp = await self._async_client.post(self.url, json={"inputs": prompt, "parameters": parameters})
+        resp.raise_for_status()
+        return resp.json()[0]["generated_text"]
+
+
+class LocalModelProvider:
+    # Mirrors the HF API's parameter names so callers do not care which provider runs
+
+    def __init__(self, model_name=LLM_LOCAL_MODEL, task=LLM_LOCAL_TASK):
+        self.model_name = model_name
+        self.task = task
+        registry.register("local_llm", self._load)
+
+    def _load(self):
+        from transformers import pipeline
+        return pipeline(self.task, model=self.model_name, device=-1)
+
+    def generate(self, prompt, parameters):
+        generator = registry.get("local_llm")
+        kwargs = {
+            "max_new_tokens": parameters.get("max_new_tokens", 256),
+            "do_sample": True,
+            "temperature": parameters.get("temperature", 0.7),
+            "top_p": parameters.get("top_p", 1.0),
+        }
+        if "top_k" in parameters:
+            kwargs["top_k"] = parameters["top_k"]
+        if self.task == "text-generation":
+            kwargs["return_full_text"] = parameters.get("return_full_text", True)
+        return generator(prompt, **kwargs)[0]["generated_text"]
+
+    async def generate_async(self, prompt, parameters):
+        # CPU-bound, so it runs off the event loop
+        return await asyncio.to_thread(self.generate, prompt, parameters)
+
+
+def create_provider(session, token, timeout):
+    if LLM_PROVIDER == "local":
+        return LocalModelProvider()
+    if LLM_PROVIDER == "hf":
+        return HFInferenceProvider(session, LLM_API_URL, token, timeout)
+    raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}', expected 'hf' or 'local'")
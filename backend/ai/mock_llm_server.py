@@ -0,0 +1,124 @@
+# ai/mock_llm_server.py
+#
+# Deterministic stand-in for the Hugging Face inference API, for offline load tests:
+#
+#   cd backend && python ai/mock_llm_server.py --port 8081 --latency-ms 800 --tail-ms 8000 --tail-rate 0.02
+#   LLM_API_URL=http://127.0.0.1:8081/ gunicorn app:app
+#
+# Answers are chosen from the prompt's hash, so the same prompt always gets the same text;
+# latency and failures come from a seeded RNG, so a run can be replayed exactly.
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTINE_LINES = [
+    "Move your last caffeine intake to before 2 PM so it has cleared by bedtime.",
+    "Stop using screens at least an hour before bed to protect melatonin release.",
+    "Finish workouts three hours before sleep so your body can cool down.",
+    "Eat your last heavy meal at least three hours before going to bed.",
+    "Keep the same wake-up time every day, including weekends.",
+]
+TIP_LINES = [
+    "Try a slow 4-7-8 breathing exercise once you are in bed.",
+    "Write down anything on your mind before bed so it does not keep you awake.",
+    "Keep your bedroom cool, dark and quiet to help you stay asleep.",
+    "If a nightmare wakes you, get up briefly and do something calm in dim light.",
+    "Get some daylight soon after waking to anchor your body clock.",
+]
+
+
+def _pick(lines, digest, offset):
+    start = digest[offset] % len(lines)
+    return [lines[(start + i) % len(lines)] for i in range(3)]
+
+
+def mock_generation(prompt):
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    if "ROUTINE:" in prompt and "TIPS:" in prompt:
+        routine = "\n".join(f"- {line}" for line in _pick(ROUTINE_LINES, digest, 0))
+        tips = "\n".join(f"- {line}" for line in _pick(TIP_LINES, digest, 3))
+        return f"ROUTINE:\n{routine}\nTIPS:\n{tips}"
+    lines = ROUTINE_LINES if "routine" in prompt.lower() else TIP_LINES
+    return "\n" + "\n".join(f"- {line}" for line in _pick(lines, digest, 0))
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+
+    def draw(self):
+        # Returns (delay_seconds, fail) for the next request
+        a = self.args
+        with self.lock:
+            delay = max(0.0, self.rng.gauss(a.latency_ms, a.jitter_ms)) / 1000
+            if self.rng.random() < a.tail_rate:
+                delay += a.tail_ms / 1000
+            fail = self.rng.random() < a.error_rate
+        return delay, fail
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+                prompt = request["inputs"]
+            except (ValueError, KeyError):
+                return self._send(400, {"error": "expected JSON with 'inputs'"})
+
+            delay, fail = state.draw()
+            time.sleep(delay)
+            if fail:
+                return self._send(503, {"error": "Model is overloaded (injected)"})
+
+            generated = mock_generation(prompt)
+            if request.get("parameters", {}).get("return_full_text", True):
+                generated = prompt + generated
+            self._send(200, [{"generated_text": generated}])
+
+        def log_message(self, *args):
+            if state.args.verbose:
+                super().log_message(*args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Hugging Face text-generation endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=500, help="mean response time")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="std dev of response time")
+    parser.add_argument("--tail-ms", type=float, default=0, help="extra delay for tail requests")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of requests given --tail-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockState(args)))
+    server.daemon_threads = True
+    print(f"✅ Mock LLM server on http://{args.host}:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# ai/pipeline.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+
+# Local models (DeepFace, DistilRoBERTa, sklearn) are CPU bound, LLM calls are network bound,
+# so each kind gets its own bounded pool and one cannot starve the other.
+MODEL_WORKERS = int(os.getenv("PIPELINE_MODEL_WORKERS", "4"))
+LLM_WORKERS = int(os.getenv("PIPELINE_LLM_WORKERS", "8"))
+DEFAULT_BUDGET_SECONDS = float(os.getenv("PIPELINE_BUDGET_SECONDS", "25"))
+
+_pools = {
+    "model": ThreadPoolExecutor(max_workers=MODEL_WORKERS, thread_name_prefix="pipeline-model"),
+    "llm": ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="pipeline-llm"),
+}
+
+
+class Stage:
+    def __init__(self, name, fn, deps=(), pool="model", fallback=None):
+        self.name = name
+        self.fn = fn                # fn(results) -> value, results holds the outputs of `deps`
+        self.deps = tuple(deps)
+        self.pool = pool
+        self.fallback = fallback    # fallback(results) -> value, used on error or when over budget
+
+
+def _run_timed(stage, inputs):
+    start = time.perf_counter()
+    try:
+        return stage.fn(inputs)
+    finally:
+        metrics.observe(f"pipeline.stage.{stage.name}", time.perf_counter() - start)
+
+
+def _fallback_value(stage, results):
+    return stage.fallback(results) if stage.fallback else None
+
+
+def run_stages(stages, budget=None):
+    """Run stages as soon as their dependencies resolve, within a latency budget.
+
+    Returns (results, report). Stages that fail or do not finish in time are filled in
+    from their fallback, and are listed in report["failed"] / report["timed_out"].
+    """
+    budget = DEFAULT_BUDGET_SECONDS if budget is None else budget
+    started = time.perf_counter()
+    deadline = started + budget
+
+    results = {}
+    timings = {}
+    failed = []
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    def submit_ready():
+        for name, stage in list(pending.items()):
+            if all(dep in results for dep in stage.deps):
+                inputs = {dep: results[dep] for dep in stage.deps}
+                future = _pools[stage.pool].submit(_run_timed, stage, inputs)
+                running[future] = (stage, time.perf_counter())
+                del pending[name]
+
+    submit_ready()
+    while running:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        done, _ = wait(list(running), timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage, submitted = running.pop(future)
+            timings[stage.name] = round((time.perf_counter() - submitted) * 1000, 1)
+            try:
+                results[stage.name] = future.result()
+            except Exception as e:
+                print(f"⚠️ Pipeline stage '{stage.name}' failed:", e)
+                failed.append(stage.name)
+                results[stage.name] = _fallback_value(stage, results)
+        submit_ready()
+
+    # Whatever is still running or never started is past the budget. Running futures are
+    # left to finish in the background; their results are simply not waited for.
+    timed_out = []
+    for stage in stages:
+        if stage.name not in results:
+            timed_out.append(stage.name)
+            results[stage.name] = _fallback_value(stage, results)
+            metrics.incr(f"pipeline.timeout.{stage.name}")
+
+    total = time.perf_counter() - started
+    metrics.observe("pipeline.total", total)
+    if timed_out:
+        metrics.incr("pipeline.partial")
+
+    report = {
+        "timings_ms": timings,
+        "total_ms": round(total * 1000, 1),
+        "failed": failed,
+        "timed_out": timed_out,
+    }
+    return results, report
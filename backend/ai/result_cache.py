@@ -0,0 +1,93 @@
+# ai/result_cache.py
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+def content_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU of JSON-serialisable model results keyed by content hash.
+
+    With `persist_dir` set, entries are also written there (one small JSON file per key)
+    so they survive restarts and are shared by workers on the same host. The directory is
+    capped at `max_disk_entries` files (default `max_entries`); the least recently used
+    files, by mtime, are deleted on write.
+    """
+
+    def __init__(self, name, max_entries=512, persist_dir=None, max_disk_entries=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries or max_entries
+        self.persist_dir = persist_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.persist_dir, f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                metrics.incr(f"{self.name}.hit")
+                return self._entries[key]
+
+        if self.persist_dir:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    value = json.load(f)
+                self._remember(key, value)
+                # Refresh the mtime so pruning keeps recently read entries
+                os.utime(self._path(key))
+                metrics.incr(f"{self.name}.disk_hit")
+                return value
+            except (OSError, ValueError):
+                pass
+
+        metrics.incr(f"{self.name}.miss")
+        return None
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.incr(f"{self.name}.evicted")
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.persist_dir:
+            try:
+                # Write then rename so concurrent readers never see a partial file
+                tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, self._path(key))
+                self._prune_disk()
+            except OSError as e:
+                print(f"⚠️ Could not persist {self.name} entry:", e)
+
+    def _prune_disk(self):
+        with os.scandir(self.persist_dir) as entries:
+            files = [(entry.stat().st_mtime, entry.path) for entry in entries
+                     if entry.name.endswith(".json") and entry.is_file()]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+                metrics.incr(f"{self.name}.disk_evicted")
+            except FileNotFoundError:
+                pass  # another worker pruned it first
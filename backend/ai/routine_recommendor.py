@@ -1,14 +1,14 @@
-import os
-import requests
-from dotenv import load_dotenv
+from ai import llm_client
 
-load_dotenv()
-HF_API_URL = "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta"
-HF_TOKEN = os.getenv("HF_API_TOKEN")
-headers = {"Authorization": f"Bearer {HF_TOKEN}"}
 
+ROUTINE_PARAMETERS = {
+    "max_new_tokens": 250,
+    "temperature": 0.7,
+    "top_p": 0.9
+}
 
-def generate_custom_routine_tip(data, past_feedback=None):
+
+def build_routine_prompt(data, past_feedback=None):
     for key in ["wakeUp", "screenTime", "caffeineTime", "workoutTime", "lateMeal"]:
         data.setdefault(key, "")
 
@@ -29,7 +29,7 @@ def generate_custom_routine_tip(data, past_feedback=None):
             )
         feedback_text = "\n---\nPrevious helpful tips:\n" + "\n".join(examples)
 
-    prompt = (
+    return (
         "You are a highly analytical sleep wellness expert.\n"
         "Evaluate the user's routine and suggest exactly 3 improvements.\n"
         "ONLY suggest tips for suboptimal habits. No praise, no summaries.\n"
@@ -44,39 +44,49 @@ def generate_custom_routine_tip(data, past_feedback=None):
         "Sleep Improvement Tips:"
     )
 
+
+def parse_routine_tip(output):
+    tips_raw = output.split("Tips:")[-1]
+    tips = [line.strip("•- ").strip() for line in tips_raw.split("\n") if len(line.strip()) > 10]
+    return "\n".join(tips[:3]) if tips else "No major issues found in current routine."
+
+
+def generate_custom_routine_tip(data, past_feedback=None):
+    prompt = build_routine_prompt(data, past_feedback)
     try:
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": 250,
-                "temperature": 0.7,
-                "top_p": 0.9
-            }
-        }
-        resp = requests.post(HF_API_URL, headers=headers, json=payload, timeout=45)
-        resp.raise_for_status()
-
-        output = resp.json()[0]["generated_text"]
-        tips_raw = output.split("Tips:")[-1]
-        tips = [line.strip("•- ").strip() for line in tips_raw.split("\n") if len(line.strip()) > 10]
-        return "\n".join(tips[:3]) if tips else "No major issues found in current routine."
+        return parse_routine_tip(llm_client.generate(prompt, ROUTINE_PARAMETERS))
+    except Exception as e:
+        print("⚠️ LLM generation failed:", e)
+        return fallback_routine_tip(data)
+
 
+async def generate_custom_routine_tip_async(data, past_feedback=None):
+    prompt = build_routine_prompt(data, past_feedback)
+    try:
+        return parse_routine_tip(await llm_client.generate_async(prompt, ROUTINE_PARAMETERS))
     except Exception as e:
         print("⚠️ LLM generation failed:", e)
+        return fallback_routine_tip(data)
+
+
+def fallback_routine_tip(data):
+    screen_time = data.get("screenTime", "")
+    caffeine_time = data.get("caffeineTime", "")
+    late_meal = data.get("lateMeal", "")
 
-        fallback = []
-        try:
-            if float(screen_time) > 1.5:
-                fallback.append("Reduce screen exposure after 9 PM to improve melatonin production.")
-        except:
-            pass
-        try:
-            if int(caffeine_time.split(":")[0]) >= 16:
-                fallback.append("Avoid caffeine after 4 PM to prevent sleep disturbances.")
-        except:
-            pass
-        if late_meal.lower() in ["yes", "true", "y"]:
-            fallback.append("Avoid heavy meals at least 2 hours before going to bed.")
-        if not fallback:
-            fallback.append("Your current routine looks balanced. Keep it consistent.")
-        return "\n".join(fallback)
+    fallback = []
+    try:
+        if float(screen_time) > 1.5:
+            fallback.append("Reduce screen exposure after 9 PM to improve melatonin production.")
+    except:
+        pass
+    try:
+        if int(caffeine_time.split(":")[0]) >= 16:
+            fallback.append("Avoid caffeine after 4 PM to prevent sleep disturbances.")
+    except:
+        pass
+    if late_meal.lower() in ["yes", "true", "y"]:
+        fallback.append("Avoid heavy meals at least 2 hours before going to bed.")
+    if not fallback:
+        fallback.append("Your current routine looks balanced. Keep it consistent.")
+    return "\n".join(fallback)
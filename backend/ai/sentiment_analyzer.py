@@ -1,20 +1,48 @@
-from transformers import pipeline
+import os
 
-# Load emotion classification model
-sentiment_pipeline = pipeline(
-    "text-classification",
-    model="j-hartmann/emotion-english-distilroberta-base",
-    top_k=1
-)
+from ai.batching import MicroBatcher
+from model_registry import registry
+from inference_client import remote_task
+
+
+def _load_pipeline():
+    from transformers import pipeline
+
+    # Load emotion classification model
+    return pipeline(
+        "text-classification",
+        model="j-hartmann/emotion-english-distilroberta-base",
+        top_k=1
+    )
+
+
+registry.register("sentiment", _load_pipeline)
 
 # Define which emotions are generally positive
 POSITIVE_EMOTIONS = {"joy", "love", "surprise"}
 NEGATIVE_EMOTIONS = {"anger", "fear", "sadness", "disgust"}
 
+# Concurrent /log, /analyze and /voice_journal requests share one padded forward pass
+MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", "16"))
+MAX_BATCH_LATENCY_MS = float(os.getenv("SENTIMENT_MAX_BATCH_LATENCY_MS", "5"))
+RESULT_TIMEOUT_SECONDS = 120  # long enough to cover a cold model load
+
+
+def _classify_batch(texts):
+    sentiment_pipeline = registry.get("sentiment")
+    outputs = sentiment_pipeline(texts, batch_size=len(texts))
+    return [output[0] for output in outputs]  # Extract top label per text
+
+
+_batcher = MicroBatcher("sentiment", _classify_batch,
+                        max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_BATCH_LATENCY_MS)
+
+
+@remote_task("analyze_sentiment")
 def analyze_sentiment(text):
     try:
         # Run through transformer model (truncate to 512 chars)
-        result = sentiment_pipeline(text[:512])[0][0]  # Extract top label
+        result = _batcher.submit(text[:512]).result(timeout=RESULT_TIMEOUT_SECONDS)
         label = result["label"].lower()
         score = round(float(result["score"]), 2)
 
@@ -1,11 +1,99 @@
 # ai/stress_detector.py
 
-from deepface import DeepFace
+import io
+import os
 
-def detect_stress(image_path):
+import numpy as np
+from PIL import Image
+
+from ai.result_cache import ResultCache, content_key
+from model_registry import registry
+from inference_client import remote_task
+
+# Upload limits, checked before anything is decoded
+MAX_IMAGE_BYTES = int(os.getenv("STRESS_MAX_IMAGE_BYTES", str(5 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("STRESS_MAX_IMAGE_PIXELS", str(4096 * 4096)))
+# Frames are downscaled to this longest side; the emotion net itself only sees a 48x48 face crop
+ANALYSIS_MAX_SIDE = int(os.getenv("STRESS_ANALYSIS_MAX_SIDE", "640"))
+
+# /analyze followed by /log usually submits the same webcam frame twice
+_cache = ResultCache(
+    "stress_cache",
+    max_entries=int(os.getenv("STRESS_CACHE_SIZE", "512")),
+    persist_dir=os.getenv("STRESS_CACHE_DIR") or None,
+    max_disk_entries=int(os.getenv("STRESS_CACHE_DISK_SIZE", "0")) or None
+)
+
+UNKNOWN_RESULT = {
+    "emotion": "unknown",
+    "stress_level_numeric": 0.0,
+    "stress_level_label": "Unknown"
+}
+
+
+def _load_deepface():
+    # Importing DeepFace pulls in TensorFlow; building the emotion net up front keeps
+    # that cost out of the first request that needs it
+    from deepface import DeepFace
     try:
+        DeepFace.build_model("Emotion")
+    except Exception as e:
+        print("⚠️ Could not prebuild DeepFace emotion model:", e)
+    return DeepFace
+
+registry.register("deepface", _load_deepface)
+
+
+class ImageRejected(ValueError):
+    # status is the HTTP response code: 413 for the size limits, 400 for undecodable data
+    def __init__(self, message, status=413):
+        super().__init__(message)
+        self.status = status
+
+
+def read_image_upload(file_storage):
+    # Read at most one byte past the limit so oversized uploads are never fully buffered
+    data = file_storage.stream.read(MAX_IMAGE_BYTES + 1)
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageRejected(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+    validate_image(data)
+    return data
+
+
+def validate_image(data):
+    try:
+        # Only parses the header, pixels are not decoded here
+        width, height = Image.open(io.BytesIO(data)).size
+    except Exception:
+        raise ImageRejected("Unreadable image", status=400)
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageRejected(f"Image exceeds {MAX_IMAGE_PIXELS} pixels")
+
+
+def decode_image(data):
+    image = Image.open(io.BytesIO(data))
+    # For JPEGs this lets the decoder scale down in the DCT domain instead of after decoding
+    image.draft("RGB", (ANALYSIS_MAX_SIDE, ANALYSIS_MAX_SIDE))
+    image = image.convert("RGB")
+    image.thumbnail((ANALYSIS_MAX_SIDE, ANALYSIS_MAX_SIDE))
+    return np.asarray(image)[:, :, ::-1]  # DeepFace expects BGR arrays
+
+
+@remote_task("detect_stress")
+def detect_stress(image_bytes, text_input=None):
+    if image_bytes is None:
+        # No frame to analyse (e.g. voice journals); report unknown rather than guess
+        return dict(UNKNOWN_RESULT)
+
+    try:
+        key = content_key(image_bytes)
+        cached = _cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        DeepFace = registry.get("deepface")
         analysis = DeepFace.analyze(
-            img_path=image_path,
+            img_path=decode_image(image_bytes),
             actions=['emotion'],
             enforce_detection=False
         )
@@ -27,16 +115,14 @@ def detect_stress(image_path):
         else:
             level = "Low"
 
-        return {
+        result = {
             "emotion": dominant_emotion,
-            "stress_level_numeric": round(stress_score, 2),
+            "stress_level_numeric": round(float(stress_score), 2),
             "stress_level_label": level
         }
+        _cache.put(key, result)
+        return dict(result)
 
     except Exception as e:
         print("❌ Stress detection failed:", e)
-        return {
-            "emotion": "unknown",
-            "stress_level_numeric": 0.0,
-            "stress_level_label": "Unknown"
-        }
+        return dict(UNKNOWN_RESULT)
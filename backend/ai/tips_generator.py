@@ -1,12 +1,4 @@
-import os
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-
-HF_API_URL = "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta"
-HF_TOKEN = os.getenv("HF_API_TOKEN")
-headers = {"Authorization": f"Bearer {HF_TOKEN}"}
+from ai import llm_client
 
 
 def generate_tips(data, past_feedback=None):
@@ -53,43 +45,40 @@ def generate_tips(data, past_feedback=None):
     )
 
     try:
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": 350,
-                "temperature": 0.7,
-                "top_k": 50,
-                "top_p": 0.95
-            }
-        }
-        resp = requests.post(HF_API_URL, headers=headers, json=payload, timeout=45)
-        resp.raise_for_status()
-
-        output = resp.json()[0]["generated_text"]
+        output = llm_client.generate(prompt, {
+            "max_new_tokens": 350,
+            "temperature": 0.7,
+            "top_k": 50,
+            "top_p": 0.95
+        })
         tips_raw = output.split("Tips:")[-1]
         tips = [line.strip("•- ").strip() for line in tips_raw.split("\n") if len(line.strip()) > 10]
         return tips[:3] if tips else ["Keep up the good routine!"]
 
     except Exception as e:
         print("HF generate_tips failed:", e)
+        return fallback_tips(data)
 
-        fallback = []
-        hours = data.get("hours_slept", 0)
-        if hours > 9:
-            fallback.append("Try to limit sleep to 7–9 hours to avoid grogginess or sleep inertia.")
-        elif hours < 6:
-            fallback.append("Aim for at least 7 hours of sleep to feel more refreshed.")
 
-        if data.get("screen_time", 0) > 3:
-            fallback.append("Limit screen use before bed to reduce blue light disruption.")
+def fallback_tips(data):
+    journal = data.get("journal", "").lower()
+    fallback = []
+    hours = data.get("hours_slept", 0)
+    if hours > 9:
+        fallback.append("Try to limit sleep to 7–9 hours to avoid grogginess or sleep inertia.")
+    elif hours < 6:
+        fallback.append("Aim for at least 7 hours of sleep to feel more refreshed.")
+
+    if data.get("screen_time", 0) > 3:
+        fallback.append("Limit screen use before bed to reduce blue light disruption.")
 
-        if data.get("caffeine", 0) > 1:
-            fallback.append("Avoid caffeine after 2 PM to prevent it from affecting your sleep.")
+    if data.get("caffeine", 0) > 1:
+        fallback.append("Avoid caffeine after 2 PM to prevent it from affecting your sleep.")
 
-        if any(word in journal for word in ["nightmare", "dream", "scared", "horrified", "anxious"]):
-            fallback.append("Try calming techniques before bed, like breathing exercises or gentle music.")
+    if any(word in journal for word in ["nightmare", "dream", "scared", "horrified", "anxious"]):
+        fallback.append("Try calming techniques before bed, like breathing exercises or gentle music.")
 
-        if not fallback:
-            fallback.append("Your current sleep habits look good! Stay consistent.")
+    if not fallback:
+        fallback.append("Your current sleep habits look good! Stay consistent.")
 
-        return fallback[:3]
+    return fallback[:3]
@@ -1,16 +1,100 @@
 # backend/ai/voice_transcriber.py
 
-import whisper
 import os
-import tempfile
+import subprocess
+
+import numpy as np
+
+from model_registry import registry
+from inference_client import remote_task
+
+SAMPLE_RATE = 16000  # Whisper's native rate
+# Audio is decoded and transcribed one window at a time, so memory does not grow with length
+CHUNK_SECONDS = int(os.getenv("WHISPER_CHUNK_SECONDS", "30"))
+# Tail of the previous chunk's text handed to the next one to keep wording consistent
+PROMPT_CHARS = 200
+
+
+# Per-deployment trade-off between latency and accuracy; see benchmarks/whisper_bench.py
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_SIZES = ["tiny", "base", "small"]
+# "int8" quantizes the Linear layers (attention + MLP, most of the compute) for CPU inference
+WHISPER_QUANTIZE = os.getenv("WHISPER_QUANTIZE", "")
+
+
+def _as_plain_linear(module, torch):
+    # Whisper subclasses nn.Linear, which dynamic quantization does not recognise;
+    # on fp32 CPU the subclass behaves exactly like the base class, so swap it in
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.load_state_dict(child.state_dict())
+            setattr(module, name, plain)
+        else:
+            _as_plain_linear(child, torch)
+
+
+def load_whisper(size=WHISPER_MODEL, quantize=WHISPER_QUANTIZE):
+    if size not in WHISPER_SIZES:
+        raise ValueError(f"Unsupported Whisper model '{size}', expected one of {WHISPER_SIZES}")
+    import torch
+    import whisper
+
+    model = whisper.load_model(size, device="cpu")
+    if quantize == "int8":
+        _as_plain_linear(model, torch)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif quantize:
+        raise ValueError(f"Unsupported WHISPER_QUANTIZE '{quantize}', expected 'int8' or empty")
+    return model
+
+registry.register("whisper", load_whisper)
+
+
+def iter_audio_chunks(file_path, chunk_seconds=CHUNK_SECONDS):
+    # ffmpeg streams 16 kHz mono PCM through a pipe; only the current window is held in memory
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    chunk_bytes = SAMPLE_RATE * chunk_seconds * 2  # 2 bytes per int16 sample
+    try:
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+        # A corrupt upload or failed decode would otherwise read as a short or empty recording
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode the audio (exit status {proc.returncode})")
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+@remote_task("transcribe_chunk")
+def transcribe_chunk(audio, initial_prompt=None, model=None):
+    if model is None:
+        model = registry.get("whisper")
+    # CPU only: fp16 would just be emulated and trigger a warning per call
+    result = model.transcribe(audio, initial_prompt=initial_prompt, fp16=False)
+    return result.get("text", "").strip()
+
+
+def transcribe_stream(file_path):
+    prompt = None
+    for audio in iter_audio_chunks(file_path):
+        text = transcribe_chunk(audio, initial_prompt=prompt)
+        if text:
+            yield text
+            prompt = text[-PROMPT_CHARS:]
 
-# Load Whisper model only once
-model = whisper.load_model("base")  # use "tiny", "base", or "small" for faster inference
 
 def transcribe_audio(file_path):
     try:
-        result = model.transcribe(file_path)
-        return result.get("text", "").strip()
+        return " ".join(transcribe_stream(file_path)).strip()
     except Exception as e:
         print("❌ Transcription failed:", e)
         return ""
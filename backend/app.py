@@ -1,91 +1,156 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS, cross_origin
+import json
+import os
 import tempfile
+import time
 import firebase_admin_init
-from datetime import datetime
+from auth import has_metrics_token, require_auth, verify_token
+from datetime import datetime, timedelta
 from ai.bedtime_generator import generate_bedtime_story
-from ai.routine_recommendor import generate_custom_routine_tip
-from firebase_admin import auth as firebase_auth, exceptions
-from ml.sleep_model import predict_sleep_score
-from ml.predictor import predict_next_score
+from ai.routine_recommendor import generate_custom_routine_tip, fallback_routine_tip
+from ml.sleep_model import predict_sleep_score, predict_sleep_scores
+from ml.rescore import rescore_user_history
+from ml.history_transfer import FORMATS as TRANSFER_FORMATS, export_sleep_logs, import_sleep_logs
+from ml.predictor import predict_next_score, predict_user_next_score
 from db.firestore import (
-    store_sleep_log, get_sleep_logs,
+    store_sleep_log, get_sleep_logs, HISTORY_FIELDS,
+    get_sleep_logs_page, count_sleep_logs, get_sleep_stats,
+    get_rollups,
     set_user_sleep_reminder, get_user_sleep_reminder,
     get_suggested_sleep_time,
     store_fcm_token, get_fcm_token,
     send_push_notification,
     get_streak, get_user_badges,
-    store_voice_journal,
+    store_voice_journal, FirestoreJobStore,
     get_user_routine_history,
     save_tip_feedback, get_helpful_tips_and_inputs,
     award_xp, get_xp,
     get_user_quests, mark_quest_completed,
-    get_user_quests_by_companion  # ✅ NEW
+    get_user_quests_by_companion,  # ✅ NEW
+    get_user_profile,
+    UserWriteBatch
+)
+from ai.stress_detector import (
+    detect_stress, read_image_upload, ImageRejected, MAX_IMAGE_BYTES, UNKNOWN_RESULT as STRESS_UNKNOWN,
 )
-from ai.stress_detector import detect_stress
 from ai.sentiment_analyzer import analyze_sentiment
-from ai.tips_generator import generate_tips
-from ai.voice_transcriber import transcribe_audio
+from ai.tips_generator import generate_tips, fallback_tips
+from ai.advice_generator import generate_tips_and_routine
+from ai.pipeline import Stage, run_stages
+from ai.voice_transcriber import transcribe_audio, transcribe_stream
 from routes.insights import insights_bp
+import metrics
+from jobs import JobQueue, QueueFull
+from model_registry import registry, warm_up_from_env
+from inference_client import uses_sidecar, call as inference_call
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": [
+CORS_ORIGINS = [
     "http://localhost:5173",
     "https://effulgent-sundae-e24053.netlify.app"
-]}})
+]
 
+app = Flask(__name__)
+CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}})
 
-# ------------------ AUTH ------------------ #
 
-def verify_token(req):
-    auth_header = req.headers.get('Authorization', None)
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return None
-    id_token = auth_header.split("Bearer ")[1]
-    try:
-        decoded = firebase_auth.verify_id_token(id_token)
-        return decoded['uid']
-    except (firebase_auth.InvalidIdTokenError, exceptions.FirebaseError):
-        return None
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+# Default chart range per rollup period, in days, and the most rollups one request returns
+ROLLUP_DEFAULT_DAYS = {"day": 90, "week": 52 * 7}
+ROLLUP_MAX_RESULTS = 400
 
 # ------------------ ANALYSIS ------------------ #
 
-def analyze_sleep_data(data, image):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-        image.save(tmp.name)
-        stress_result = detect_stress(tmp.name)
+SENTIMENT_FALLBACK = {"mood": "Unknown", "polarity": 0.0}
+# Returned when the sleep model fails or runs past the budget; never stored on the log
+SLEEP_SCORE_FALLBACK = float(os.getenv("SLEEP_SCORE_FALLBACK", "50"))
+# Set COMBINED_ADVICE=0 to go back to separate routine and tips generation calls on /log
+COMBINED_ADVICE = os.getenv("COMBINED_ADVICE", "1") == "1"
+# The image plus the journal and routine fields of a /log or /analyze form
+ANALYSIS_MAX_REQUEST_BYTES = MAX_IMAGE_BYTES + 64 * 1024
 
-    sentiment = analyze_sentiment(data["journal"])
-    stress_level_numeric = float(stress_result.get("stress_level_numeric", 0))
-
-    data["emotion"] = stress_result.get("emotion")
-    data["stress_level"] = stress_level_numeric
-    data["sentiment"] = sentiment
+def check_analysis_size():
+    # Before request.form / request.files, which would receive and buffer the whole body
+    if (request.content_length or 0) > ANALYSIS_MAX_REQUEST_BYTES:
+        raise ImageRejected(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
 
+def analyze_sleep_data(data, image):
     for field in ["wakeUp", "screenTime", "caffeineTime", "workoutTime", "lateMeal"]:
         data.setdefault(field, "")
 
-    sleep_score = predict_sleep_score(data)
-    routine = generate_custom_routine_tip(data)
-    tips = generate_tips(data)
+    # Raises ImageRejected for oversized or unreadable uploads; decoding happens once, in the stress stage
+    image_bytes = read_image_upload(image)
+
+    def with_stress(r):
+        stress = r["stress"]
+        return {**data, "stress_level": float(stress.get("stress_level_numeric", 0))}
+
+    def with_analysis(r):
+        return {**with_stress(r), "emotion": r["stress"].get("emotion"), "sentiment": r["sentiment"]}
+
+    # Stress and sentiment run side by side with the routine LLM call; the score waits on
+    # stress only and the personalised tips wait on stress + sentiment.
+    stages = [
+        Stage("stress", lambda r: detect_stress(image_bytes),
+              fallback=lambda r: dict(STRESS_UNKNOWN)),
+        Stage("sentiment", lambda r: analyze_sentiment(data["journal"]),
+              fallback=lambda r: dict(SENTIMENT_FALLBACK)),
+        Stage("sleep_score", lambda r: predict_sleep_score(with_stress(r)), deps=["stress"],
+              fallback=lambda r: SLEEP_SCORE_FALLBACK),
+    ]
+    if COMBINED_ADVICE:
+        # One generation request yields both the routine improvements and the tips
+        stages.append(Stage("advice", lambda r: generate_tips_and_routine(with_analysis(r)),
+                            deps=["stress", "sentiment"], pool="llm",
+                            fallback=lambda r: (fallback_routine_tip(data), fallback_tips(with_analysis(r)))))
+    else:
+        stages += [
+            Stage("routine", lambda r: generate_custom_routine_tip(dict(data)), pool="llm",
+                  fallback=lambda r: fallback_routine_tip(data)),
+            Stage("tips", lambda r: generate_tips(with_analysis(r)), deps=["stress", "sentiment"], pool="llm",
+                  fallback=lambda r: fallback_tips(with_analysis(r))),
+        ]
+    results, report = run_stages(stages)
+    if COMBINED_ADVICE:
+        results["routine"], results["tips"] = results.pop("advice")
+
+    stress_result = results["stress"]
+    data["emotion"] = stress_result.get("emotion")
+    data["stress_level"] = float(stress_result.get("stress_level_numeric", 0))
+    data["sentiment"] = results["sentiment"]
 
     return {
-        "sleep_score": sleep_score,
-        "routine": routine,
-        "tips": tips,
-        "sentiment": sentiment,
+        "sleep_score": results["sleep_score"],
+        "sleep_score_fallback": "sleep_score" in report["failed"] + report["timed_out"],
+        "routine": results["routine"],
+        "tips": results["tips"],
+        "sentiment": results["sentiment"],
         "emotion": stress_result.get("emotion"),
         "stress_level_numeric": stress_result.get("stress_level_numeric"),
-        "stress_level_label": stress_result.get("stress_level_label")
+        "stress_level_label": stress_result.get("stress_level_label"),
+        "pipeline": report
     }
 
+def analysis_response(result):
+    # Per-stage timings and failures are for operators: only returned with the metrics token
+    report = result.pop("pipeline")
+    if has_metrics_token(request):
+        return jsonify({**result, "pipeline": report})
+    if report["failed"] or report["timed_out"]:
+        print("⚠️ Analysis pipeline fell back:", json.dumps(report))
+    return jsonify(result)
+
+@app.errorhandler(ImageRejected)
+def image_rejected(e):
+    return jsonify({"error": str(e)}), e.status
+
 # ------------------ ROUTES ------------------ #
 
 @app.route('/log', methods=['POST'])
-def log_data():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def log_data(user_id):
+    check_analysis_size()
     data = request.form.to_dict()
     image = request.files.get("image")
     for key in ["hours_slept", "stress_level", "caffeine", "screen_time"]:
@@ -94,63 +159,221 @@ def log_data():
         return jsonify({"error": "Image and journal are required"}), 400
     result = analyze_sleep_data(data, image)
     data.update(result)
-    store_sleep_log(user_id, data)
-    award_xp(user_id, 25)
+    if result["sleep_score_fallback"]:
+        # Stored unscored and flagged, so stats, rollups and the predictor skip it until
+        # POST /rescore (or rescore_history.py --fallback-only) scores it
+        data["sleep_score"] = None
+    batch = UserWriteBatch(user_id)
+    store_sleep_log(user_id, data, batch=batch)
+    award_xp(user_id, 25, batch=batch)
 
-    # ✅ Auto quest checks
-    from db.firestore import get_sleep_logs, get_streak
-    if len(get_sleep_logs(user_id)) >= 1:
-        mark_quest_completed(user_id, "log_sleep_once")
-    if get_streak(user_id) >= 3:
-        mark_quest_completed(user_id, "log_3_nights")
+    # ✅ Auto quest checks, evaluated against the stats written in the same commit
+    batch.complete_quest("log_sleep_once", when=lambda stats: stats["entry_count"] >= 1)
+    batch.complete_quest("log_3_nights", when=lambda stats: stats["current_streak"] >= 3)
+    batch.commit()
 
-    return jsonify(result)
+    return analysis_response(result)
 
 @app.route('/analyze', methods=['POST'])
 def analyze_with_image():
+    check_analysis_size()
     data = request.form.to_dict()
     image = request.files.get("image")
     for key in ["hours_slept", "stress_level", "caffeine", "screen_time"]:
         data[key] = float(data.get(key, 0))
     if not image or not data.get("journal", "").strip():
         return jsonify({"error": "Image and journal are required"}), 400
-    return jsonify(analyze_sleep_data(data, image))
+    return analysis_response(analyze_sleep_data(data, image))
+
+def parse_history_args(args):
+    """Read the /history query string, shared with the async view in async_app.py.
+
+    Returns (mode, kwargs) with mode "count", "all" (the unpaginated form kept for
+    existing clients) or "page". Raises ValueError with the message for a bad limit or
+    unknown fields.
+    """
+    window = {"since": args.get("since"), "until": args.get("until")}
+    if args.get("count_only") in ["1", "true"]:
+        return "count", window
+
+    fields = [f.strip() for f in args.get("fields", "").split(",") if f.strip()] or None
+    unknown = [f for f in fields or [] if f not in HISTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)} "
+                         f"(available: {', '.join(HISTORY_FIELDS)})")
+    query = {**window, "fields": fields, "descending": args.get("order") == "desc"}
+    if "limit" not in args and "start_after" not in args:
+        return "all", query
+
+    try:
+        limit = min(int(args.get("limit", HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return "page", {**query, "limit": limit, "start_after": args.get("start_after")}
 
 @app.route('/history', methods=['GET'])
-def fetch_logs():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
-    return jsonify(get_sleep_logs(user_id))
+@require_auth
+def fetch_logs(user_id):
+    try:
+        mode, query = parse_history_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if mode == "count":
+        return jsonify({"count": count_sleep_logs(user_id, **query)})
+    if mode == "all":
+        return jsonify(get_sleep_logs(user_id, **query))
+    return jsonify(get_sleep_logs_page(user_id, **query))
+
+@app.route('/rollups', methods=['GET'])
+@require_auth
+def fetch_rollups(user_id):
+    # Per-day or per-week summaries for the Tracker charts; since/until are YYYY-MM-DD
+    period = request.args.get("period", "day")
+    if period not in ROLLUP_DEFAULT_DAYS:
+        return jsonify({"error": "period must be 'day' or 'week'"}), 400
+    since = request.args.get("since") or \
+        (datetime.utcnow().date() - timedelta(days=ROLLUP_DEFAULT_DAYS[period])).isoformat()
+    rollups = get_rollups(user_id, period, since=since, until=request.args.get("until"),
+                          limit=ROLLUP_MAX_RESULTS)
+    return jsonify({"period": period, "rollups": rollups})
+
+# ------------------ BATCH SCORING ------------------ #
+
+SCORE_BATCH_MAX_ROWS = int(os.getenv("SCORE_BATCH_MAX_ROWS", "10000"))
+
+# Job status is kept in Firestore, so a poll can be answered by any worker, not only the
+# one running the job
+job_store = FirestoreJobStore()
+
+rescore_jobs = JobQueue("rescore_jobs", workers=int(os.getenv("RESCORE_JOB_WORKERS", "1")),
+                        max_pending=int(os.getenv("RESCORE_JOB_MAX_PENDING", "8")), store=job_store)
+
+@app.route('/score_batch', methods=['POST'])
+@require_auth
+def score_batch(user_id):
+    rows = (request.get_json(silent=True) or {}).get("rows")
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "rows must be a non-empty list"}), 400
+    if len(rows) > SCORE_BATCH_MAX_ROWS:
+        return jsonify({"error": f"at most {SCORE_BATCH_MAX_ROWS} rows per request"}), 413
+    try:
+        scores = predict_sleep_scores(rows)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"scores": scores})
+
+@app.route('/rescore', methods=['POST'])
+@require_auth
+def rescore(user_id):
+    # Rewrites sleep_score on the caller's whole history with the current model
+    try:
+        job_id = rescore_jobs.submit(rescore_user_history, user_id, owner=user_id)
+    except QueueFull:
+        return jsonify({"error": "Rescoring queue is full, try again shortly"}), 503, {"Retry-After": "30"}
+    return jsonify({"job_id": job_id, "status_url": f"/rescore/{job_id}"}), 202
+
+@app.route('/rescore/<job_id>', methods=['GET'])
+@require_auth
+def rescore_status(user_id, job_id):
+    job = rescore_jobs.get(job_id, owner=user_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+# ------------------ EXPORT / IMPORT ------------------ #
+
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+import_jobs = JobQueue("import_jobs", workers=int(os.getenv("IMPORT_JOB_WORKERS", "1")),
+                       max_pending=int(os.getenv("IMPORT_JOB_MAX_PENDING", "8")), store=job_store)
+
+@app.route('/export', methods=['GET'])
+@require_auth
+def export_history(user_id):
+    file_format = request.args.get("format", "ndjson")
+    if file_format not in TRANSFER_FORMATS:
+        return jsonify({"error": "format must be 'ndjson' or 'parquet'"}), 400
+    return Response(stream_with_context(export_sleep_logs(user_id, file_format)),
+                    mimetype=TRANSFER_FORMATS[file_format],
+                    headers={"Content-Disposition": f'attachment; filename="sleep_history.{file_format}"',
+                             "X-Accel-Buffering": "no"})
+
+@app.route('/import', methods=['POST'])
+@require_auth
+def import_history(user_id):
+    # The request body is the file itself, in the format named by ?format= or its Content-Type
+    file_format = request.args.get("format") or \
+        next((f for f, mimetype in TRANSFER_FORMATS.items() if mimetype == request.mimetype), None)
+    if file_format not in TRANSFER_FORMATS:
+        return jsonify({"error": "Send ?format=ndjson|parquet or a matching Content-Type"}), 400
+    if (request.content_length or 0) > IMPORT_MAX_BYTES:
+        return jsonify({"error": f"Imports are limited to {IMPORT_MAX_BYTES} bytes"}), 413
+
+    # Spooled to disk in chunks, so a large upload never sits in worker memory
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_format}") as tmp:
+        while True:
+            chunk = request.stream.read(1024 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > IMPORT_MAX_BYTES:
+                break
+            tmp.write(chunk)
+    if size > IMPORT_MAX_BYTES or size == 0:
+        os.remove(tmp.name)
+        if size:
+            return jsonify({"error": f"Imports are limited to {IMPORT_MAX_BYTES} bytes"}), 413
+        return jsonify({"error": "Empty import"}), 400
+
+    try:
+        # The job removes the temp file when done
+        job_id = import_jobs.submit(import_sleep_logs, user_id, tmp.name, file_format, owner=user_id)
+    except QueueFull:
+        os.remove(tmp.name)
+        return jsonify({"error": "Import queue is full, try again shortly"}), 503, {"Retry-After": "30"}
+    return jsonify({"job_id": job_id, "status_url": f"/import/{job_id}"}), 202
+
+@app.route('/import/<job_id>', methods=['GET'])
+@require_auth
+def import_status(user_id, job_id):
+    job = import_jobs.get(job_id, owner=user_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
 
 @app.route('/predict_next', methods=['POST'])
 def predict():
+    user_id = verify_token(request)
+    if user_id:
+        # Signed-in callers are predicted from their stored logs, not the request body
+        return jsonify({"predicted_score": predict_user_next_score(user_id, get_sleep_stats(user_id))})
     logs = request.json.get("logs")
     return jsonify({"predicted_score": predict_next_score(logs)})
 
 @app.route('/submit_tip_feedback', methods=['POST'])
-def submit_tip_feedback():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def submit_tip_feedback(user_id):
     data = request.json
     tip = data.get("tip")
     feedback = data.get("feedback")
     inputs = data.get("inputs", {})
     if not tip or feedback not in ["helpful", "not helpful"]:
         return jsonify({"error": "Invalid input"}), 400
-    save_tip_feedback(user_id, tip, feedback, inputs)
+    batch = UserWriteBatch(user_id)
+    save_tip_feedback(user_id, tip, feedback, inputs, batch=batch)
     if feedback == "helpful":
-        award_xp(user_id, 10)
+        award_xp(user_id, 10, batch=batch)
+    batch.commit()
     return jsonify({"message": "Feedback recorded"})
 
 # ------------------ REMINDERS ------------------ #
 
 @app.route('/set_reminder', methods=['POST'])
-def set_reminder():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def set_reminder(user_id):
     preferred_time = request.json.get("preferred_sleep_time")
     if not preferred_time:
         return jsonify({"error": "preferred_sleep_time is required"}), 400
@@ -160,26 +383,20 @@ def set_reminder():
         send_push_notification(token, "Reminder Set ✅", f"Sleep reminder set for {preferred_time}")
     return jsonify({"message": "Reminder time set successfully."})
 @app.route('/get_reminder', methods=['GET'])
-def get_reminder():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def get_reminder(user_id):
     return jsonify({"preferred_sleep_time": get_user_sleep_reminder(user_id)})
 
 @app.route('/get_smart_reminder', methods=['GET'])
-def get_smart_reminder():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def get_smart_reminder(user_id):
     return jsonify({"suggested_time": get_suggested_sleep_time(user_id)})
 
 # ------------------ FCM PUSH ------------------ #
 
 @app.route('/store_fcm_token', methods=['POST'])
-def save_fcm_token():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def save_fcm_token(user_id):
     token = request.json.get("token")
     if not token:
         return jsonify({"error": "FCM token required"}), 400
@@ -188,10 +405,8 @@ def save_fcm_token():
 
 @app.route('/trigger_fcm', methods=['POST', 'OPTIONS'])
 @cross_origin()
-def trigger_fcm():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def trigger_fcm(user_id):
     token = get_fcm_token(user_id)
     if not token:
         return jsonify({"error": "No FCM token registered"}), 400
@@ -201,47 +416,40 @@ def trigger_fcm():
 # ------------------ GAMIFICATION ------------------ #
 
 @app.route('/get_streak', methods=['GET'])
-def fetch_streak():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def fetch_streak(user_id):
     return jsonify({"streak": get_streak(user_id)})
 
 @app.route('/get_badges', methods=['GET'])
-def fetch_badges():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def fetch_badges(user_id):
     return jsonify({"badges": get_user_badges(user_id)})
 
 @app.route('/get_xp', methods=['GET'])
-def fetch_xp():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def fetch_xp(user_id):
     return jsonify({"xp": get_xp(user_id)})
 
+@app.route('/profile', methods=['GET'])
+@require_auth
+def fetch_profile(user_id):
+    return jsonify(get_user_profile(user_id))
+
 # ------------------ QUEST SYSTEM ------------------ #
 
 @app.route('/get_quests', methods=['GET'])
-def get_quests():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def get_quests(user_id):
     return jsonify({"quests": get_user_quests(user_id)})
 
 @app.route('/get_quests/<companion>', methods=['GET'])
-def get_quests_by_companion(companion):
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def get_quests_by_companion(user_id, companion):
     return jsonify({"quests": get_user_quests_by_companion(user_id, companion)})
 
 @app.route('/complete_quest', methods=['POST'])
-def complete_quest():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def complete_quest(user_id):
     data = request.json
     quest_id = data.get("quest_id")
     if not quest_id:
@@ -253,14 +461,8 @@ def complete_quest():
 
 @app.route('/api/quest_progress', methods=['POST', 'OPTIONS'])
 @cross_origin()
-def quest_progress():
-    if request.method == 'OPTIONS':
-        return '', 200  # preflight check success
-
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
-
+@require_auth
+def quest_progress(user_id):
     data = request.json
     quest_name = data.get("quest")
 
@@ -274,56 +476,139 @@ def quest_progress():
 
 # ------------------ VOICE JOURNAL ------------------ #
 
-@app.route('/voice_journal', methods=['POST'])
-def voice_journal():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+VOICE_JOB_WORKERS = int(os.getenv("VOICE_JOB_WORKERS", "2"))
+VOICE_JOB_MAX_PENDING = int(os.getenv("VOICE_JOB_MAX_PENDING", "16"))
+VOICE_MAX_UPLOAD_BYTES = int(os.getenv("VOICE_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+
+voice_jobs = JobQueue("voice_jobs", workers=VOICE_JOB_WORKERS, max_pending=VOICE_JOB_MAX_PENDING,
+                      store=job_store)
+
+def process_voice_journal(user_id, audio_path, timings):
+    try:
+        started = time.perf_counter()
+        transcript = transcribe_audio(audio_path)
+        timings["transcribe"] = round((time.perf_counter() - started) * 1000, 1)
+    finally:
+        os.remove(audio_path)
+    if not transcript:
+        raise RuntimeError("Transcription failed")
+    return finish_voice_journal(user_id, transcript, timings)
+
+def save_voice_upload():
+    """Save the request's audio file to a temp file; returns (path, error response)."""
+    # Checked before the form is parsed, and again on disk for uploads sent without a length
+    too_large = jsonify({"error": f"Audio uploads are limited to {VOICE_MAX_UPLOAD_BYTES} bytes"}), 413
+    if (request.content_length or 0) > VOICE_MAX_UPLOAD_BYTES:
+        return None, too_large
     audio = request.files.get("audio")
     if not audio:
-        return jsonify({"error": "No audio file provided"}), 400
+        return None, (jsonify({"error": "No audio file provided"}), 400)
     with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
         audio.save(tmp.name)
-        transcript = transcribe_audio(tmp.name)
-    if not transcript:
-        return jsonify({"error": "Transcription failed"}), 500
+    if os.path.getsize(tmp.name) > VOICE_MAX_UPLOAD_BYTES:
+        os.remove(tmp.name)
+        return None, too_large
+    return tmp.name, None
+
+def finish_voice_journal(user_id, transcript, timings):
+    started = time.perf_counter()
     sentiment = analyze_sentiment(transcript)
     stress_result = detect_stress(None, text_input=transcript)
+    timings["analysis"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    batch = UserWriteBatch(user_id)
     store_voice_journal(user_id, transcript, metadata={
         "sentiment": sentiment,
         "emotion": stress_result.get("emotion"),
         "stress_level": stress_result.get("stress_level_numeric"),
         "stress_label": stress_result.get("stress_level_label")
-    })
-    award_xp(user_id, 15)
+    }, batch=batch)
+    award_xp(user_id, 15, batch=batch)
 
     # ✅ Auto quest
-    mark_quest_completed(user_id, "complete_voice_journal")
+    mark_quest_completed(user_id, "complete_voice_journal", batch=batch)
+    batch.commit()
+    timings["store"] = round((time.perf_counter() - started) * 1000, 1)
 
-    return jsonify({
+    return {
         "transcript": transcript,
         "sentiment": sentiment,
         "emotion": stress_result.get("emotion"),
         "stress_level_numeric": stress_result.get("stress_level_numeric"),
         "stress_level_label": stress_result.get("stress_level_label")
-    })
+    }
+
+@app.route('/voice_journal', methods=['POST'])
+@require_auth
+def voice_journal(user_id):
+    audio_path, error = save_voice_upload()
+    if error:
+        return error
+    try:
+        # Transcription runs in the background; the job removes the temp file when done
+        job_id = voice_jobs.submit(process_voice_journal, user_id, audio_path, owner=user_id)
+    except QueueFull:
+        os.remove(audio_path)
+        return jsonify({"error": "Voice journal queue is full, try again shortly"}), 503, {"Retry-After": "10"}
+    return jsonify({"job_id": job_id, "status_url": f"/voice_journal/{job_id}"}), 202
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/voice_journal/stream', methods=['POST'])
+@require_auth
+def voice_journal_stream(user_id):
+    audio_path, error = save_voice_upload()
+    if error:
+        return error
+
+    def events():
+        # Partial transcripts are pushed as each window finishes, then the stored result
+        timings = {}
+        parts = []
+        try:
+            started = time.perf_counter()
+            for index, text in enumerate(transcribe_stream(audio_path)):
+                parts.append(text)
+                yield _sse("partial", {"index": index, "text": text})
+            timings["transcribe"] = round((time.perf_counter() - started) * 1000, 1)
+
+            transcript = " ".join(parts).strip()
+            if not transcript:
+                yield _sse("error", {"error": "Transcription failed"})
+                return
+            result = finish_voice_journal(user_id, transcript, timings)
+            yield _sse("done", {**result, "timings_ms": timings})
+        except Exception as e:
+            print("❌ Streaming transcription failed:", e)
+            yield _sse("error", {"error": "Transcription failed"})
+        finally:
+            os.remove(audio_path)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/voice_journal/<job_id>', methods=['GET'])
+@require_auth
+def voice_journal_status(user_id, job_id):
+    job = voice_jobs.get(job_id, owner=user_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
 
 # ------------------ ROUTINE AGENT ------------------ #
 
 @app.route('/optimize_routine_agent', methods=['GET'])
-def optimize_routine_agent():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def optimize_routine_agent(user_id):
     history = get_user_routine_history(user_id, limit=10)
     tips = generate_custom_routine_tip({}, past_feedback=history)
     return jsonify({"tips": tips})
 
 @app.route('/routine_tip', methods=['POST'])
-def routine_tip():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
+@require_auth
+def routine_tip(user_id):
     data = request.json
     feedback = get_helpful_tips_and_inputs(user_id)
     tip = generate_custom_routine_tip(data, past_feedback=feedback)
@@ -332,11 +617,8 @@ def routine_tip():
 # ------------------ STORY / LULLABY ------------------ #
 
 @app.route('/bedtime_content', methods=['GET'])
-def get_bedtime_content():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
-
+@require_auth
+def get_bedtime_content(user_id):
     style = request.args.get("style", "story")
     age_group = request.args.get("age", "young")
     theme = request.args.get("theme", "dreams")
@@ -349,21 +631,48 @@ def get_bedtime_content():
 
 
 @app.route('/mark_sleep_healer_used', methods=['POST'])
-def mark_sleep_healer_used():
-    user_id = verify_token(request)
-    if not user_id:
-        return jsonify({"error": "Unauthorized"}), 401
-
+@require_auth
+def mark_sleep_healer_used(user_id):
     # Mark the use_sleep_healer quest complete
     success = mark_quest_completed(user_id, "use_sleep_healer")
     if not success:
         return jsonify({"message": "Quest already completed or invalid"}), 200
     return jsonify({"message": "Sleep Healer quest completed and XP awarded!"})
 
+# ------------------ HEALTH ------------------ #
+
+@app.route('/health', methods=['GET'])
+def health():
+    # Always 200 while the process serves; "ready" says whether every model is loaded
+    if uses_sidecar():
+        try:
+            models = inference_call("status")["models"]
+        except Exception as e:
+            models = {"sidecar": {"state": "unreachable", "error": str(e)}}
+    else:
+        models = registry.status()
+    return jsonify({
+        "status": "ok",
+        "ready": all(m["state"] == "ready" for m in models.values()),
+        "models": models
+    })
+
+# ------------------ METRICS ------------------ #
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Internal counters and latencies; only for scrapers holding METRICS_TOKEN
+    if not has_metrics_token(request):
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(metrics.snapshot())
+
 # ------------------ BLUEPRINTS ------------------ #
 
 app.register_blueprint(insights_bp)
 
+# Models load on first use unless MODEL_WARMUP asks for a background preload
+warm_up_from_env()
+
 # ------------------ START APP ------------------ #
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+# async_app.py
+#
+# ASGI entry point. The I/O-bound routes below run as async views, so while one waits on
+# Firestore, FCM or the LLM endpoint the worker keeps serving other requests instead of
+# pinning a thread. Every other route is handed to the Flask app in app.py unchanged.
+#
+#   uvicorn async_app:application --port 5000 --workers 2
+#   gunicorn async_app:application -k uvicorn.workers.UvicornWorker
+#
+# `gunicorn app:app` (the Procfile) keeps serving everything synchronously.
+
+import asyncio
+import os
+import traceback
+from functools import wraps
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart, g, jsonify, request
+from quart_cors import cors
+
+from app import app as flask_app, CORS_ORIGINS, parse_history_args
+from auth import verify_token_async
+from ai.routine_recommendor import generate_custom_routine_tip_async
+from db.firestore_async import (
+    count_sleep_logs, get_fcm_token, get_helpful_tips_and_inputs, get_sleep_logs,
+    get_sleep_logs_page, get_sleep_stats, get_user_quests, send_push_notification,
+)
+from ml.insights_engine import get_user_insights
+from routes.insights import parse_window
+
+# Threads for the Flask routes (analysis, uploads, writes) passed through by this app
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+
+async_app = cors(Quart(__name__), allow_origin=CORS_ORIGINS)
+
+
+def require_auth(view):
+    # Same contract as auth.require_auth: the verified uid is the view's first argument
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        user_id = await verify_token_async(request)
+        if not user_id:
+            return jsonify({"error": "Unauthorized"}), 401
+        g.user_id = user_id
+        return await view(user_id, *args, **kwargs)
+    return wrapper
+
+
+@async_app.route('/history', methods=['GET'])
+@require_auth
+async def fetch_logs(user_id):
+    try:
+        mode, query = parse_history_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if mode == "count":
+        return jsonify({"count": await count_sleep_logs(user_id, **query)})
+    if mode == "all":
+        return jsonify(await get_sleep_logs(user_id, **query))
+    return jsonify(await get_sleep_logs_page(user_id, **query))
+
+@async_app.route('/get_insights', methods=['GET'])
+@require_auth
+async def get_insights(user_id):
+    try:
+        window = parse_window(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        stats = await get_sleep_stats(user_id)
+        # The engine's frame work (and any cache-miss load) is CPU-bound, so keep it off the loop
+        return jsonify(await asyncio.to_thread(get_user_insights, user_id, stats, window))
+    except Exception as e:
+        print("❌ Insight generation failed:", e)
+        traceback.print_exc()
+        return jsonify({"error": "Something went wrong while generating insights."}), 500
+
+@async_app.route('/get_quests', methods=['GET'])
+@require_auth
+async def get_quests(user_id):
+    return jsonify({"quests": await get_user_quests(user_id)})
+
+@async_app.route('/trigger_fcm', methods=['POST'])
+@require_auth
+async def trigger_fcm(user_id):
+    token = await get_fcm_token(user_id)
+    if not token:
+        return jsonify({"error": "No FCM token registered"}), 400
+    await send_push_notification(token, "⏰ Sleep Reminder", "It's time to wind down and sleep well.")
+    return jsonify({"message": "Push notification sent!"})
+
+@async_app.route('/routine_tip', methods=['POST'])
+@require_auth
+async def routine_tip(user_id):
+    data = await request.get_json()
+    feedback = await get_helpful_tips_and_inputs(user_id)
+    tip = await generate_custom_routine_tip_async(data, past_feedback=feedback)
+    return jsonify({"tip": tip})
+
+
+class RouteDispatcher:
+    """Sends requests for paths the async app defines to it and everything else to Flask."""
+
+    def __init__(self, async_app, wsgi_app, wsgi_threads):
+        self.async_app = async_app
+        self.wsgi_app = WSGIMiddleware(wsgi_app, workers=wsgi_threads)
+        self.async_paths = {rule.rule for rule in async_app.url_map.iter_rules()
+                            if "<" not in rule.rule}
+
+    async def __call__(self, scope, receive, send):
+        # Lifespan events go to Quart so its startup/shutdown hooks run
+        if scope["type"] == "lifespan" or scope.get("path") in self.async_paths:
+            await self.async_app(scope, receive, send)
+        else:
+            await self.wsgi_app(scope, receive, send)
+
+
+application = RouteDispatcher(async_app, flask_app, WSGI_THREADS)
@@ -0,0 +1,119 @@
+# auth.py
+
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify, g
+from firebase_admin import auth as firebase_auth, exceptions
+
+import metrics
+
+# Decoded ID tokens are reused until shortly before they expire
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKEN_EXPIRY_LEEWAY_SECONDS = 30
+# /metrics is disabled unless METRICS_TOKEN is set; scrapers send it as a bearer token,
+# and requests that already carry an ID token (e.g. /log) as X-Metrics-Token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _token_key(id_token):
+    # Only the hash is kept in memory, never the bearer token itself
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+
+def _cached_claims(key):
+    with _token_cache_lock:
+        claims = _token_cache.get(key)
+        if claims is None:
+            return None
+        if claims.get("exp", 0) - TOKEN_EXPIRY_LEEWAY_SECONDS <= time.time():
+            del _token_cache[key]
+            metrics.incr("auth.token_cache.expired")
+            return None
+        _token_cache.move_to_end(key)
+        return claims
+
+
+def _cache_claims(key, claims):
+    with _token_cache_lock:
+        _token_cache[key] = claims
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
+def verify_id_token(id_token):
+    key = _token_key(id_token)
+    claims = _cached_claims(key)
+    if claims is not None:
+        metrics.incr("auth.token_cache.hit")
+        return claims
+
+    metrics.incr("auth.token_cache.miss")
+    claims = firebase_auth.verify_id_token(id_token)
+    _cache_claims(key, claims)
+    return claims
+
+
+def _bearer_token(req):
+    auth_header = req.headers.get('Authorization', None)
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split("Bearer ")[1]
+
+
+def has_metrics_token(req):
+    token = req.headers.get("X-Metrics-Token") or _bearer_token(req)
+    return bool(METRICS_TOKEN) and token is not None and hmac.compare_digest(token, METRICS_TOKEN)
+
+
+def verify_token(req):
+    id_token = _bearer_token(req)
+    if not id_token:
+        return None
+    try:
+        return verify_id_token(id_token)['uid']
+    except (firebase_auth.InvalidIdTokenError, exceptions.FirebaseError, ValueError) as e:
+        print("❌ Token verification failed:", e)
+        return None
+
+
+async def verify_token_async(req):
+    # For the ASGI app: cache hits stay on the event loop, a miss (which may fetch
+    # Google's signing keys) is verified on a worker thread
+    id_token = _bearer_token(req)
+    if not id_token:
+        return None
+    claims = _cached_claims(_token_key(id_token))
+    if claims is not None:
+        metrics.incr("auth.token_cache.hit")
+        return claims['uid']
+    try:
+        return (await asyncio.to_thread(verify_id_token, id_token))['uid']
+    except (firebase_auth.InvalidIdTokenError, exceptions.FirebaseError, ValueError) as e:
+        print("❌ Token verification failed:", e)
+        return None
+
+
+def require_auth(view):
+    """Reject the request with 401 unless it carries a valid Firebase ID token.
+
+    The verified uid is passed to the view as its first argument and kept on flask.g.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = verify_token(request)
+        if not user_id:
+            return jsonify({"error": "Unauthorized"}), 401
+        g.user_id = user_id
+        return view(user_id, *args, **kwargs)
+    return wrapper
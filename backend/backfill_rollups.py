@@ -0,0 +1,44 @@
+# backfill_rollups.py
+#
+# Builds the day/week rollups (sleep_rollups/{uid}) from raw entries, for users whose logs
+# predate them. Safe to re-run: each user's rollups are recomputed from scratch.
+#
+#   cd backend && python backfill_rollups.py              # every user with sleep logs
+#   cd backend && python backfill_rollups.py --user UID
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from db.firestore import db, rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill daily and weekly sleep rollups")
+    parser.add_argument("--user", action="append", help="only this user id (repeatable)")
+    parser.add_argument("--workers", type=int, default=4, help="users rebuilt in parallel")
+    args = parser.parse_args()
+
+    # list_documents also returns parents that only exist through their entries subcollection
+    user_ids = args.user or [ref.id for ref in db.collection("sleep_logs").list_documents()]
+    print(f"Rebuilding rollups for {len(user_ids)} user(s)")
+
+    def rebuild(user_id):
+        try:
+            return user_id, rebuild_rollups(user_id), None
+        except Exception as e:
+            return user_id, None, e
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for i, (user_id, counts, error) in enumerate(pool.map(rebuild, user_ids), 1):
+            if error is not None:
+                failed += 1
+                print(f"❌ [{i}/{len(user_ids)}] {user_id}: {error}")
+            else:
+                print(f"✅ [{i}/{len(user_ids)}] {user_id}: {counts['day']} days, {counts['week']} weeks")
+    if failed:
+        raise SystemExit(f"{failed} user(s) failed; re-run with --user for each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/inference_mode_bench.py
+#
+# Compares memory and throughput of the three INFERENCE_MODE settings with the same
+# number of gunicorn workers:
+#
+#   cd backend && python benchmarks/inference_mode_bench.py --workers 4 --image face.jpg
+#
+# Memory is the summed PSS of the gunicorn master, its workers and (in sidecar mode) the
+# inference server, so pages shared between processes are only counted once.
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def process_tree(pid):
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def wait_until_ready(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).json().get("ready"):
+                return True
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(1)
+    return False
+
+
+def load_test(base_url, image_path, requests_total, concurrency):
+    with open(image_path, "rb") as f:
+        image = f.read()
+
+    def one(i):
+        started = time.perf_counter()
+        resp = requests.post(f"{base_url}/analyze", timeout=120, files={"image": ("frame.jpg", image)},
+                             data={"journal": f"Slept badly, woke up twice (run {i}).",
+                                   "hours_slept": 6, "stress_level": 5, "caffeine": 2, "screen_time": 3})
+        return resp.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests_total)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "requests": requests_total,
+        "errors": sum(1 for status, _ in results if status != 200),
+        "throughput_rps": round(requests_total / elapsed, 2),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+    }
+
+
+def run_mode(mode, args):
+    env = {**os.environ, "INFERENCE_MODE": mode, "MODEL_WARMUP": "all", "WEB_CONCURRENCY": str(args.workers)}
+    procs = []
+    try:
+        if mode == "sidecar":
+            procs.append(subprocess.Popen([sys.executable, "inference_server.py"], cwd=BACKEND_DIR, env=env))
+        procs.append(subprocess.Popen(["gunicorn", "-b", f"127.0.0.1:{args.port}", "app:app"],
+                                      cwd=BACKEND_DIR, env=env))
+        base_url = f"http://127.0.0.1:{args.port}"
+        if not wait_until_ready(base_url, args.startup_timeout):
+            return {"mode": mode, "error": "not ready before timeout"}
+
+        # With MODEL_WARMUP=all every local-mode worker loads its own copy; give them time to finish
+        time.sleep(args.settle)
+        memory = sum(pss_mb(pid) for proc in procs for pid in process_tree(proc.pid))
+        result = {"mode": mode, "workers": args.workers, "pss_mb": round(memory, 1)}
+        result.update(load_test(base_url, args.image, args.requests, args.concurrency))
+        return result
+    finally:
+        for proc in reversed(procs):
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker vs preload vs sidecar model hosting")
+    parser.add_argument("--image", required=True, help="face image posted to /analyze")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8055)
+    parser.add_argument("--startup-timeout", type=int, default=600)
+    parser.add_argument("--settle", type=int, default=30)
+    parser.add_argument("--modes", default="local,preload,sidecar")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in args.modes.split(",")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/load_test.py
+#
+# Closed-loop load generator for the API. Run the server against the mock LLM to get
+# repeatable numbers without network access:
+#
+#   python ai/mock_llm_server.py --latency-ms 800 --tail-ms 8000 --tail-rate 0.02 &
+#   LLM_API_URL=http://127.0.0.1:8081/ gunicorn app:app -b 127.0.0.1:5000 &
+#   python benchmarks/load_test.py --scenario routine_tip --token "$ID_TOKEN" --concurrency 32
+#   python benchmarks/load_test.py --scenario log --image face.jpg --token "$ID_TOKEN"
+#
+# With no network at all (no Google signing keys, no Firestore), serve
+# benchmarks/offline_app.py instead: the same app over an in-memory Firestore, where any
+# bearer token is accepted as its own user and /log commits through the real transaction:
+#
+#   LLM_API_URL=http://127.0.0.1:8081/ gunicorn benchmarks.offline_app:app -b 127.0.0.1:5000 &
+#   python benchmarks/load_test.py --scenario log --image face.jpg --token offline-user-1
+#
+# --client async drives the requests from one event loop (httpx), which can keep
+# thousands of requests open at once; use it for --concurrency beyond a few hundred.
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+JOURNAL = "Woke up twice around 3am, felt anxious about work and had a strange dream."
+ROUTINE = {"wakeUp": "07:00", "screenTime": "2", "caffeineTime": "17:00", "workoutTime": "20:00", "lateMeal": "yes"}
+
+
+def scenario_request(scenario, image_bytes, i):
+    # Returns (method, path, request kwargs) for request i of the scenario; requests and
+    # httpx accept the same json/data/files keywords
+    if scenario == "routine_tip":
+        # A distinct routine per request, so the LLM cache and coalescing do not hide upstream latency
+        return "POST", "/routine_tip", {"json": {**ROUTINE, "screenTime": f"{i / 1000:.3f}"}}
+    if scenario in ("log", "analyze"):
+        form = {"journal": JOURNAL, "hours_slept": "6", "stress_level": "5", "caffeine": "2",
+                "screen_time": "3", "mood": "tired", **ROUTINE}
+        return "POST", f"/{scenario}", {"data": form, "files": {"image": ("frame.jpg", image_bytes)}}
+    return "GET", f"/{scenario}", {}
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for s in statuses if s is None or s >= 400),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+    }
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def run_threads(args, image_bytes):
+    local = threading.local()
+    headers = auth_headers(args.token)
+
+    def one(i):
+        method, path, kwargs = scenario_request(args.scenario, image_bytes, i)
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            status = session.request(method, args.url + path, headers=headers, timeout=args.timeout, **kwargs).status_code
+        except requests.RequestException:
+            status = None
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    return summarize([r[0] for r in results], [r[1] for r in results], time.perf_counter() - started)
+
+
+async def _run_async(args, image_bytes):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, headers=auth_headers(args.token),
+                                 timeout=args.timeout, limits=limits) as client:
+        async def one(i):
+            method, path, kwargs = scenario_request(args.scenario, image_bytes, i)
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    status = (await client.request(method, path, **kwargs)).status_code
+                except httpx.HTTPError:
+                    status = None
+                return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return summarize([r[0] for r in results], [r[1] for r in results], time.perf_counter() - started)
+
+
+def run_load(args, image_bytes):
+    if args.client == "async":
+        return asyncio.run(_run_async(args, image_bytes))
+    return run_threads(args, image_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SleepWell API load test")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--scenario", default="routine_tip",
+                        help="routine_tip, log, analyze, or any GET route such as history or get_quests")
+    parser.add_argument("--token", default=os.getenv("SLEEPWELL_ID_TOKEN"), help="Firebase ID token")
+    parser.add_argument("--image", help="face image for the log/analyze scenarios")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--client", choices=["threads", "async"], default="threads")
+    args = parser.parse_args()
+
+    image_bytes = None
+    if args.scenario in ("log", "analyze"):
+        if not args.image:
+            parser.error("--image is required for the log and analyze scenarios")
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+
+    result = {"scenario": args.scenario, "client": args.client, "concurrency": args.concurrency}
+    result.update(run_load(args, image_bytes))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/model_bench.py
+#
+# Scores every registered sleep model version on the same evaluation rows, in one process,
+# so accuracy and latency regressions between versions show up side by side:
+#
+#   cd backend && python benchmarks/model_bench.py --source exports/logs.ndjson --max-rows 50000
+#   cd backend && python benchmarks/model_bench.py --output benchmarks/model_bench.json
+#
+# Versions trained on rows from --source look better than they are; point it at data newer
+# than the models (or the training run's holdout) for an honest comparison.
+
+import argparse
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml import model_store  # noqa: E402
+from ml.training_data import iter_chunks, load_sample  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sleep model versions on the same rows")
+    parser.add_argument("--source", default=os.path.join(BACKEND_DIR, "ml", "sample_sleep_data.csv"),
+                        help=".csv, .ndjson/.jsonl file, or 'firestore'")
+    parser.add_argument("--max-rows", type=int, default=100000, help="seeded uniform sample of the source")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--versions", help="comma separated; default every registered version")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    X, y, counts = load_sample(iter_chunks(args.source), args.max_rows, args.seed)
+    if not counts["used"]:
+        raise SystemExit(f"No usable rows in {args.source}")
+    registry = model_store.read_registry()
+    versions = args.versions.split(",") if args.versions else sorted(
+        registry["versions"], key=lambda v: registry["versions"][v].get("created_at", ""))
+
+    results = []
+    for version in versions:
+        model_path = os.path.join(model_store.version_dir(version), model_store.MODEL_FILE)
+        results.append({
+            "version": version,
+            "active": version == registry["active"],
+            "params": registry["versions"].get(version, {}).get("params"),
+            "artifact_bytes": os.path.getsize(model_path),
+            "error": model_store.holdout_metrics(model_store.load_version(version), X, y),
+            **model_store.measure_artifact(model_path),
+        })
+
+    report = {"source": args.source, "rows": counts, "versions": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# benchmarks/offline_app.py
+#
+# app.py wired to fakes, for running benchmarks/load_test.py on a machine with no network
+# (no Google signing keys, no Firestore). Serve it from backend/ instead of app:app:
+#
+#   LLM_API_URL=http://127.0.0.1:8081/ gunicorn benchmarks.offline_app:app -b 127.0.0.1:5000
+#
+# Every request still goes through the production code paths, including
+# UserWriteBatch.commit's transaction; only the Firestore client underneath is the
+# in-memory one from tests/fake_firestore.py, and any bearer token is accepted as its own
+# user. Each gunicorn worker has its own in-memory database. Never deploy this module.
+
+import time
+
+from tests.fake_firestore import FakeClient, initialize_app
+
+# Before anything imports firebase_admin_init, which would load the service account
+initialize_app()
+
+import auth  # noqa: E402
+from db import firestore as db_firestore  # noqa: E402
+
+db_firestore.db = FakeClient()
+
+
+def verify_any_token(id_token):
+    # Any bearer token is accepted and names its own user
+    return {"uid": "offline-" + auth._token_key(id_token)[:16], "exp": time.time() + 3600}
+
+
+auth.verify_id_token = verify_any_token
+
+from app import app  # noqa: E402,F401
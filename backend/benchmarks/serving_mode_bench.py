@@ -0,0 +1,95 @@
+# benchmarks/serving_mode_bench.py
+#
+# Compares the sync Flask app (gunicorn app:app) with the ASGI app (async_app.py under
+# uvicorn workers) on the I/O-bound routes, with the same number of worker processes:
+#
+#   cd backend && python benchmarks/serving_mode_bench.py --token "$ID_TOKEN" --concurrency 50,500,2000
+#
+# The LLM endpoint is the mock server with a fixed latency, so /routine_tip measures how
+# many slow upstream calls each mode can keep in flight rather than model speed.
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import requests
+
+from load_test import run_load
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "sync": ["gunicorn", "app:app"],
+    "async": ["gunicorn", "async_app:application", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def wait_until_up(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/health", timeout=2)
+            return True
+        except requests.RequestException:
+            time.sleep(1)
+    return False
+
+
+def run_mode(mode, args, llm_url):
+    # The breaker is disabled so a saturated sync worker's timeouts do not turn into fast failures
+    env = {**os.environ, "WEB_CONCURRENCY": str(args.workers), "LLM_API_URL": llm_url,
+           "LLM_BREAKER_FAILURES": "1000000"}
+    server = subprocess.Popen(SERVERS[mode] + ["-b", f"127.0.0.1:{args.port}"], cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        if not wait_until_up(base_url, args.startup_timeout):
+            return [{"mode": mode, "error": "not up before timeout"}]
+        results = []
+        for scenario in args.scenarios.split(","):
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                load = SimpleNamespace(url=base_url, scenario=scenario, token=args.token, client="async",
+                                       requests=max(args.requests, concurrency), concurrency=concurrency,
+                                       timeout=args.timeout)
+                result = {"mode": mode, "scenario": scenario, "concurrency": concurrency}
+                result.update(run_load(load, None))
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+        return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync (WSGI) vs async (ASGI) serving of the I/O-bound routes")
+    parser.add_argument("--token", default=os.getenv("SLEEPWELL_ID_TOKEN"), required=not os.getenv("SLEEPWELL_ID_TOKEN"))
+    parser.add_argument("--scenarios", default="history,get_insights,get_quests,routine_tip")
+    parser.add_argument("--concurrency", default="50,500,2000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--llm-latency-ms", type=float, default=1000)
+    parser.add_argument("--port", type=int, default=8056)
+    parser.add_argument("--llm-port", type=int, default=8081)
+    parser.add_argument("--startup-timeout", type=int, default=120)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    llm = subprocess.Popen([sys.executable, "ai/mock_llm_server.py", "--port", str(args.llm_port),
+                            "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", "0"], cwd=BACKEND_DIR)
+    try:
+        llm_url = f"http://127.0.0.1:{args.llm_port}/"
+        results = [row for mode in args.modes.split(",") for row in run_mode(mode, args, llm_url)]
+    finally:
+        llm.send_signal(signal.SIGTERM)
+        llm.wait(timeout=10)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
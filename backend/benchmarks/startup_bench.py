@@ -0,0 +1,77 @@
+# benchmarks/startup_bench.py
+#
+# Measures how long a fresh worker takes before it can serve a lightweight route, and
+# what each model costs when it is finally loaded.
+#
+#   cd backend && python benchmarks/startup_bench.py [--runs 3] [--load-models]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside a clean interpreter so import caches from earlier runs do not skew results
+CHILD = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+client = app_module.app.test_client()
+response = client.get("/health")
+first_response = time.perf_counter()
+result = {
+    "import_s": imported - start,
+    "first_response_s": first_response - start,
+    "health_status": response.status_code,
+    "rss_mb_after_start": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}
+if "--load-models" in sys.argv:
+    from model_registry import registry
+    loads = {}
+    for name in registry.names():
+        t = time.perf_counter()
+        registry.get(name)
+        loads[name] = time.perf_counter() - t
+    result["model_load_s"] = loads
+    result["rss_mb_all_models"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print("BENCH" + json.dumps(result))
+'''
+
+
+def run_once(load_models):
+    args = [sys.executable, "-c", CHILD] + (["--load-models"] if load_models else [])
+    env = {**os.environ, "MODEL_WARMUP": ""}
+    proc = subprocess.run(args, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    line = next(l for l in proc.stdout.splitlines() if l.startswith("BENCH"))
+    return json.loads(line[len("BENCH"):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker startup benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--load-models", action="store_true",
+                        help="also load every registered model and time each one")
+    args = parser.parse_args()
+
+    runs = [run_once(args.load_models) for _ in range(args.runs)]
+    summary = {
+        "runs": args.runs,
+        "import_s_median": round(statistics.median(r["import_s"] for r in runs), 3),
+        "first_response_s_median": round(statistics.median(r["first_response_s"] for r in runs), 3),
+        "rss_mb_after_start_median": round(statistics.median(r["rss_mb_after_start"] for r in runs), 1),
+    }
+    if args.load_models:
+        names = runs[0]["model_load_s"].keys()
+        summary["model_load_s_median"] = {
+            name: round(statistics.median(r["model_load_s"][name] for r in runs), 2) for name in names
+        }
+        summary["rss_mb_all_models_median"] = round(statistics.median(r["rss_mb_all_models"] for r in runs), 1)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/whisper_bench.py
+#
+# Real-time factor and word error rate for each Whisper size / precision on CPU:
+#
+#   cd backend && python benchmarks/whisper_bench.py --configs tiny,tiny:int8,base,base:int8,small:int8
+#
+# Samples are read from a manifest.jsonl in --samples, one JSON object per line:
+#   {"audio": "morning_note.wav", "text": "reference transcript ..."}
+# with audio paths relative to the manifest. RTF < 1 means faster than real time. By default
+# the bundled clips in benchmarks/whisper_samples are used (see its README).
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ai.voice_transcriber import (  # noqa: E402
+    SAMPLE_RATE, iter_audio_chunks, load_whisper, transcribe_chunk, PROMPT_CHARS
+)
+
+DEFAULT_SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "whisper_samples")
+
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    # Levenshtein distance over words, one row at a time
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_samples(samples_dir):
+    manifest = os.path.join(samples_dir, "manifest.jsonl")
+    if not os.path.exists(manifest):
+        sys.exit(f"No manifest found at {manifest}")
+    with open(manifest, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    for sample in samples:
+        sample["audio"] = os.path.join(samples_dir, sample["audio"])
+    return samples
+
+
+def transcribe(model, path):
+    # Same chunked path the server uses, so the numbers match production behaviour
+    parts, prompt, samples = [], None, 0
+    for audio in iter_audio_chunks(path):
+        samples += len(audio)
+        # The undecorated function: with INFERENCE_MODE=sidecar the wrapper would pickle the
+        # model over to the sidecar and time that instead of the config loaded here
+        text = transcribe_chunk.__wrapped__(audio, initial_prompt=prompt, model=model)
+        if text:
+            parts.append(text)
+            prompt = text[-PROMPT_CHARS:]
+    return " ".join(parts), samples / SAMPLE_RATE
+
+
+def bench_config(size, quantize, samples):
+    started = time.perf_counter()
+    model = load_whisper(size, quantize)
+    load_s = time.perf_counter() - started
+
+    # Warm-up so one-off allocations are not billed to the first sample
+    transcribe(model, samples[0]["audio"])
+
+    audio_s = compute_s = 0.0
+    errors = []
+    for sample in samples:
+        started = time.perf_counter()
+        text, duration = transcribe(model, sample["audio"])
+        compute_s += time.perf_counter() - started
+        audio_s += duration
+        errors.append(word_error_rate(sample["text"], text))
+
+    return {
+        "model": size,
+        "precision": quantize or "fp32",
+        "load_s": round(load_s, 2),
+        "audio_s": round(audio_s, 1),
+        "rtf": round(compute_s / audio_s, 3) if audio_s else None,
+        "wer": round(sum(errors) / len(errors), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper CPU latency/accuracy benchmark")
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES)
+    parser.add_argument("--configs", default="tiny,tiny:int8,base,base:int8,small,small:int8",
+                        help="comma separated size[:int8] entries")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    samples = load_samples(args.samples)
+    results = []
+    for config in args.configs.split(","):
+        size, _, quantize = config.strip().partition(":")
+        result = bench_config(size, quantize, samples)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+
+    print(f"\n{'model':<8}{'precision':<11}{'load s':>8}{'RTF':>8}{'WER':>8}")
+    for r in results:
+        print(f"{r['model']:<8}{r['precision']:<11}{r['load_s']:>8}{r['rtf']:>8}{r['wer']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# Lets tests import the backend modules (ml.*, db.*) the same way the app does, and swaps
+# Firestore for the in-memory fake in tests/fake_firestore.py
+
+import pytest
+
+from tests.fake_firestore import FakeClient, initialize_app
+
+initialize_app()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    from db import firestore as db_firestore
+
+    client = FakeClient()
+    monkeypatch.setattr(db_firestore, "db", client)
+    db_firestore._user_cache.clear()
+    return client
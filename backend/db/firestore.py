@@ -1,17 +1,99 @@
 from firebase_admin import firestore, messaging
+from google.cloud.firestore_v1.field_path import FieldPath
+from flask import g, has_app_context
 from datetime import datetime, timedelta
 import os
+import threading
+import time
 
 # Initialize Firebase safely
 import firebase_admin_init
+import metrics
+from db.rollups import PERIODS, apply_log_to_rollup, empty_rollup, rollup_keys
 
 db = firestore.client()
 
+# -------------------------
+# 👤 User Document Cache
+# -------------------------
+
+# users/{uid} is read once per request and shared by every getter below. Setting
+# USER_CACHE_TTL_SECONDS > 0 also keeps it across requests in this process.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "0"))
+
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+def _request_user_cache():
+    if not has_app_context():
+        return None
+    if "user_docs" not in g:
+        g.user_docs = {}
+    return g.user_docs
+
+def get_user_doc(user_id):
+    request_cache = _request_user_cache()
+    if request_cache is not None and user_id in request_cache:
+        metrics.incr("user_cache.request_hit")
+        return request_cache[user_id]
+
+    cached = ttl_cached_user_doc(user_id)
+    if cached is not None:
+        if request_cache is not None:
+            request_cache[user_id] = cached
+        return cached
+
+    metrics.incr("user_cache.miss")
+    doc = db.collection("users").document(user_id).get()
+    data = doc.to_dict() if doc.exists else {}
+    cache_user_doc(user_id, data)
+    return data
+
+def ttl_cached_user_doc(user_id):
+    if USER_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        metrics.incr("user_cache.ttl_hit")
+        return cached[1]
+    return None
+
+def cache_user_doc(user_id, data):
+    request_cache = _request_user_cache()
+    if request_cache is not None:
+        request_cache[user_id] = data
+    if USER_CACHE_TTL_SECONDS > 0:
+        with _user_cache_lock:
+            _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, data)
+
+def invalidate_user_doc(user_id):
+    request_cache = _request_user_cache()
+    if request_cache is not None:
+        request_cache.pop(user_id, None)
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+def _is_plain_value(value):
+    return isinstance(value, (str, int, float, bool, list, dict, type(None)))
+
+def update_user_doc(user_id, fields):
+    db.collection("users").document(user_id).set(fields, merge=True)
+
+    # Write through plain values; transforms like Increment are resolved server-side,
+    # so the cached copy is dropped and re-read on next use instead.
+    request_cache = _request_user_cache()
+    cached = request_cache.get(user_id) if request_cache is not None else None
+    if cached is None or not all(_is_plain_value(v) for v in fields.values()):
+        invalidate_user_doc(user_id)
+        return
+    cache_user_doc(user_id, {**cached, **fields})
+
 # -------------------------
 # 💤 Sleep Log Management
 # -------------------------
 
-def store_sleep_log(user_id, data):
+def store_sleep_log(user_id, data, batch=None):
     log = {
         "user_id": user_id,
         "hours_slept": float(data.get("hours_slept", 0)),
@@ -28,116 +110,320 @@ def store_sleep_log(user_id, data):
             log[key.lower()] = data[key]
 
     if "sleep_score" in data:
-        log["sleep_score"] = float(data["sleep_score"])
-
-    db.collection('sleep_logs').document(user_id).collection('entries').add(log)
+        log["sleep_score"] = None if data["sleep_score"] is None else float(data["sleep_score"])
+    if data.get("sleep_score_fallback"):
+        # The model failed for this log; rescoring clears the flag
+        log["sleep_score_fallback"] = True
+    if data.get("emotion"):
+        log["emotion"] = data["emotion"]
+
+    if batch is not None:
+        batch.add_sleep_log(log)
+        return None
 
-    update_streak(user_id)
-    evaluate_and_award_badges(user_id)
-
-def get_sleep_logs(user_id):
-    docs = db.collection('sleep_logs').document(user_id).collection('entries') \
-        .order_by("timestamp").stream()
-    logs = []
-    for doc in docs:
-        d = doc.to_dict()
-        logs.append({
-            "hours_slept": float(d.get("hours_slept", 0)),
-            "sleep_score": float(d.get("sleep_score", 0)),
-            "timestamp": d.get("timestamp", ""),
-            "screen_time": float(d.get("screen_time", 0)),
-            "caffeine": float(d.get("caffeine", 0)),
-            "mood": d.get("mood", "Unknown"),
-        })
-    return logs
+    batch = UserWriteBatch(user_id)
+    batch.add_sleep_log(log)
+    batch.commit()
+    return batch.stats
+
+# The query builders and row shapers in this file that take a `client` or shape raw
+# documents are public because db/firestore_async.py reuses them on its AsyncClient.
+
+# Fields returned by /history and how to read each one from a stored entry
+HISTORY_FIELDS = {
+    "hours_slept": lambda d: float(d.get("hours_slept", 0)),
+    "sleep_score": lambda d: None if d.get("sleep_score") is None else float(d["sleep_score"]),
+    "timestamp": lambda d: d.get("timestamp", ""),
+    "screen_time": lambda d: float(d.get("screen_time", 0)),
+    "caffeine": lambda d: float(d.get("caffeine", 0)),
+    "mood": lambda d: d.get("mood", "Unknown"),
+}
+
+def sleep_logs_query(user_id, since=None, until=None, descending=False, client=None):
+    # `client` lets db/firestore_async.py build the same query on its AsyncClient
+    query = (client or db).collection('sleep_logs').document(user_id).collection('entries')
+    # Timestamps are stored as UTC ISO strings, so string comparison orders them correctly
+    if since:
+        query = query.where("timestamp", ">=", since)
+    if until:
+        query = query.where("timestamp", "<", until)
+    direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+    return query.order_by("timestamp", direction=direction)
+
+def history_fields(fields):
+    return [f for f in (fields or HISTORY_FIELDS) if f in HISTORY_FIELDS]
+
+# Page cursors are "<timestamp>|<document id>"; the id breaks ties between entries with the
+# same timestamp. A bare timestamp is still accepted and resumes after that timestamp.
+CURSOR_SEPARATOR = "|"
+
+def history_query(user_id, fields, limit=None, start_after=None, since=None, until=None,
+                  descending=False, client=None):
+    query = sleep_logs_query(user_id, since, until, descending, client)
+    direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+    query = query.order_by(FieldPath.document_id(), direction=direction)
+    # timestamp is always fetched since it is part of the pagination cursor
+    query = query.select(sorted(set(fields) | {"timestamp"}))
+    if start_after:
+        timestamp, _, doc_id = start_after.partition(CURSOR_SEPARATOR)
+        query = query.start_after({"timestamp": timestamp, "__name__": doc_id} if doc_id
+                                  else {"timestamp": timestamp})
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def history_row(d, fields):
+    return {field: HISTORY_FIELDS[field](d) for field in fields}
+
+def get_sleep_logs(user_id, limit=None, start_after=None, since=None, until=None,
+                   fields=None, descending=False):
+    fields = history_fields(fields)
+    query = history_query(user_id, fields, limit, start_after, since, until, descending)
+    return [history_row(doc.to_dict(), fields) for doc in query.stream()]
+
+def get_sleep_logs_page(user_id, limit, start_after=None, since=None, until=None,
+                        fields=None, descending=False):
+    fields = history_fields(fields)
+    query = history_query(user_id, fields, limit + 1, start_after, since, until, descending)
+    return history_page([(doc.id, doc.to_dict()) for doc in query.stream()], limit, fields)
+
+def history_page(docs, limit, fields):
+    # `docs` are (document id, stored entry) pairs; one extra tells us whether another
+    # page exists without a second query
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = None
+    if has_more and docs:
+        doc_id, last = docs[-1]
+        next_cursor = f"{last.get('timestamp', '')}{CURSOR_SEPARATOR}{doc_id}"
+    return {"logs": [history_row(d, fields) for _, d in docs], "next_cursor": next_cursor}
+
+def iter_sleep_log_pages(user_id, page_size, fields=None, after=None):
+    """Yield the user's entries as lists of snapshots, oldest first, one query per page.
+
+    Each page is its own short query resumed from the previous page's last snapshot, so
+    callers can do slow work (scoring, writes) between pages without a long-lived stream.
+    `after` limits it to entries with a later timestamp.
+    """
+    query = db.collection('sleep_logs').document(user_id).collection('entries')
+    if after:
+        query = query.where("timestamp", ">", after)
+    query = query.order_by("timestamp")
+    if fields:
+        # The cursor snapshot needs the ordering field
+        query = query.select(sorted(set(fields) | {"timestamp"}))
+    last = None
+    while True:
+        page_query = query.start_after(last) if last is not None else query
+        page = list(page_query.limit(page_size).stream())
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+def sleep_log_ref(user_id, doc_id):
+    return db.collection('sleep_logs').document(user_id).collection('entries').document(doc_id)
+
+def count_sleep_logs(user_id, since=None, until=None):
+    if not since and not until:
+        return get_sleep_stats(user_id)["entry_count"]
+    result = sleep_logs_query(user_id, since, until).count().get()
+    return int(result[0][0].value)
 
 # -------------------------
-# 🔥 Streak Tracking
+# 📊 Per-user Sleep Stats (streak, badges, running sums)
 # -------------------------
 
-def update_streak(user_id):
-    entries = db.collection('sleep_logs').document(user_id).collection('entries') \
-        .order_by("timestamp", direction=firestore.Query.DESCENDING).limit(10).stream()
+def stats_ref(user_id, client=None):
+    return (client or db).collection("sleep_stats").document(user_id)
+
+def _empty_sleep_stats():
+    return {
+        "entry_count": 0,
+        "scored_count": 0,
+        "hours_sum": 0.0,
+        "score_sum": 0.0,
+        "caffeine_sum": 0.0,
+        "screen_sum": 0.0,
+        "stress_sum": 0.0,
+        "max_hours": 0.0,
+        "max_score": 0.0,
+        "last_log_date": None,
+        "last_timestamp": None,
+        "current_streak": 0,
+    }
 
-    dates = []
+def apply_log_to_stats(stats, log):
+    stats["entry_count"] += 1
+    hours = float(log.get("hours_slept", 0))
+    stats["hours_sum"] += hours
+    stats["caffeine_sum"] += float(log.get("caffeine", 0))
+    stats["screen_sum"] += float(log.get("screen_time", 0))
+    stats["stress_sum"] += float(log.get("stress_level", 0))
+    stats["max_hours"] = max(stats["max_hours"], hours)
+
+    score = log.get("sleep_score")
+    if score is not None:
+        score = float(score)
+        stats["scored_count"] += 1
+        stats["score_sum"] += score
+        stats["max_score"] = max(stats["max_score"], score)
+
+    ts = log.get("timestamp")
+    try:
+        log_date = datetime.fromisoformat(ts).date()
+    except (TypeError, ValueError):
+        return stats
+
+    last_date = stats["last_log_date"]
+    last_date = datetime.fromisoformat(last_date).date() if last_date else None
+    if last_date is None or (log_date - last_date).days > 1:
+        stats["current_streak"] = 1
+    elif (log_date - last_date).days == 1:
+        stats["current_streak"] += 1
+    elif (log_date - last_date).days < 0:
+        return stats  # Older than the latest log, streak is unaffected
+
+    stats["last_log_date"] = log_date.isoformat()
+    stats["last_timestamp"] = ts
+    return stats
+
+def _build_sleep_stats(user_id):
+    # One-off replay of the full history for users logged before stats were maintained
+    stats = _empty_sleep_stats()
+    entries = db.collection('sleep_logs').document(user_id).collection('entries') \
+        .order_by("timestamp").stream()
     for doc in entries:
-        ts = doc.to_dict().get("timestamp")
-        if ts:
-            try:
-                dt = datetime.fromisoformat(ts).date()
-                dates.append(dt)
-            except:
-                continue
+        apply_log_to_stats(stats, doc.to_dict())
+    return stats
 
-    if not dates:
-        return
+def get_sleep_stats(user_id):
+    snapshot = stats_ref(user_id).get()
+    if snapshot.exists:
+        return snapshot.to_dict()
+    stats = _build_sleep_stats(user_id)
+    stats_ref(user_id).set(stats)
+    return stats
 
-    dates = sorted(list(set(dates)), reverse=True)
-    streak = 1
-    for i in range(1, len(dates)):
-        if (dates[i - 1] - dates[i]).days == 1:
-            streak += 1
-        else:
-            break
+# -------------------------
+# 📅 Daily / Weekly Rollups
+# -------------------------
 
-    db.collection("users").document(user_id).set({
-        "current_streak": streak
-    }, merge=True)
+# Rollups are updated in the same transaction as each new log (see _commit_user_batch);
+# rebuild_rollups recomputes them from the raw entries for older users or after rescoring.
+FIRESTORE_BATCH_LIMIT = 500  # writes per batched commit
+
+def _rollup_collection(user_id, period, client=None):
+    return (client or db).collection("sleep_rollups").document(user_id).collection(PERIODS[period])
+
+def _rollups_query(user_id, period, since=None, until=None, limit=None, client=None):
+    # `start` is an ISO date, so string comparison orders it correctly
+    query = _rollup_collection(user_id, period, client)
+    if since:
+        query = query.where("start", ">=", since)
+    if until:
+        query = query.where("start", "<", until)
+    query = query.order_by("start")
+    return query.limit(limit) if limit else query
+
+def get_rollups(user_id, period="day", since=None, until=None, limit=None):
+    return [{"id": doc.id, **doc.to_dict()}
+            for doc in _rollups_query(user_id, period, since, until, limit).stream()]
+
+def write_in_batches(operations):
+    """Apply ("set" | "update" | "delete", ref, data) operations in batched commits.
+
+    Returns the number of writes. Each batch commits atomically, the whole run does not.
+    """
+    batch, pending, written = db.batch(), 0, 0
+    for op, ref, data in operations:
+        if op == "set":
+            batch.set(ref, data)
+        elif op == "update":
+            batch.update(ref, data)
+        else:
+            batch.delete(ref)
+        pending += 1
+        if pending == FIRESTORE_BATCH_LIMIT:
+            batch.commit()
+            written += pending
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+        written += pending
+    return written
+
+def rebuild_rollups(user_id):
+    """Recompute every day and week rollup of a user from their raw entries.
+
+    Returns {"day": n, "week": n} rollup counts. Rollups with no entries left are deleted.
+    """
+    rollups = {}
+    entries = db.collection('sleep_logs').document(user_id).collection('entries') \
+        .order_by("timestamp").stream()
+    for doc in entries:
+        log = doc.to_dict()
+        for period, doc_id, start in rollup_keys(log.get("timestamp")):
+            rollup = rollups.setdefault((period, doc_id), empty_rollup(period, start))
+            apply_log_to_rollup(rollup, log)
+
+    def operations():
+        for (period, doc_id), rollup in rollups.items():
+            yield "set", _rollup_collection(user_id, period).document(doc_id), rollup
+        for period in PERIODS:
+            for ref in _rollup_collection(user_id, period).list_documents():
+                if (period, ref.id) not in rollups:
+                    yield "delete", ref, None
+
+    write_in_batches(operations())
+    return {period: sum(1 for p, _ in rollups if p == period) for period in PERIODS}
+
+def rebuild_sleep_stats(user_id):
+    # Replays the history into sleep_stats and the user's streak/badges, e.g. after rescoring
+    stats = _build_sleep_stats(user_id)
+    stats_ref(user_id).set(stats)
+    update_user_doc(user_id, {
+        "current_streak": stats["current_streak"],
+        "badges": list(badges_for_stats(stats)),
+    })
+    return stats
 
 def get_streak(user_id):
-    doc = db.collection("users").document(user_id).get()
-    if doc.exists:
-        return doc.to_dict().get("current_streak", 0)
-    return 0
+    return get_user_doc(user_id).get("current_streak", 0)
 
 # -------------------------
 # 🏅 Badge System
 # -------------------------
 
-def evaluate_and_award_badges(user_id):
-    logs_ref = db.collection('sleep_logs').document(user_id).collection('entries')
-    logs = [doc.to_dict() for doc in logs_ref.stream()]
+def badges_for_stats(stats):
     badges = set()
-
-    current_streak = get_streak(user_id)
-    if current_streak >= 3:
+    if stats["current_streak"] >= 3:
         badges.add("3-Day Streak Champ")
-    if current_streak >= 7:
+    if stats["current_streak"] >= 7:
         badges.add("Weekly Streak Hero")
-
-    if len(logs) >= 5:
+    if stats["entry_count"] >= 5:
         badges.add("Consistent Logger")
-
-    for log in logs:
-        if float(log.get("hours_slept", 0)) >= 8:
-            badges.add("Full 8 Hours Achiever")
-        if float(log.get("sleep_score", 0)) >= 90:
-            badges.add("High Sleep Score 💤")
-
-    db.collection("users").document(user_id).set({
-        "badges": list(badges)
-    }, merge=True)
+    if stats["max_hours"] >= 8:
+        badges.add("Full 8 Hours Achiever")
+    if stats["max_score"] >= 90:
+        badges.add("High Sleep Score 💤")
+    return badges
 
 def get_user_badges(user_id):
-    doc = db.collection("users").document(user_id).get()
-    if doc.exists:
-        return doc.to_dict().get("badges", [])
-    return []
+    return get_user_doc(user_id).get("badges", [])
 
 # -------------------------
 # ⏰ Sleep Reminder Support
 # -------------------------
 
 def set_user_sleep_reminder(user_id, sleep_time_str):
-    db.collection('users').document(user_id).set({
+    update_user_doc(user_id, {
         "preferred_sleep_time": sleep_time_str
-    }, merge=True)
+    })
 
 def get_user_sleep_reminder(user_id):
-    doc = db.collection("users").document(user_id).get()
-    if doc.exists:
-        return doc.to_dict().get("preferred_sleep_time", None)
-    return None
+    return get_user_doc(user_id).get("preferred_sleep_time", None)
 
 def get_suggested_sleep_time(user_id):
     logs = db.collection('sleep_logs').document(user_id).collection('entries') \
@@ -166,28 +452,27 @@ def get_suggested_sleep_time(user_id):
 # -------------------------
 
 def store_fcm_token(user_id, fcm_token):
-    db.collection("users").document(user_id).set({
+    update_user_doc(user_id, {
         "fcm_token": fcm_token
-    }, merge=True)
+    })
 
 def get_fcm_token(user_id):
-    doc = db.collection("users").document(user_id).get()
-    if doc.exists:
-        return doc.to_dict().get("fcm_token")
-    return None
+    return get_user_doc(user_id).get("fcm_token")
 
-def send_push_notification(token, title, body):
-    message = messaging.Message(
+def push_message(token, title, body):
+    return messaging.Message(
         notification=messaging.Notification(title=title, body=body),
         token=token
     )
-    response = messaging.send(message)
+
+def send_push_notification(token, title, body):
+    response = messaging.send(push_message(token, title, body))
 
 # -------------------------
 # 🎙 Voice Journal Support
 # -------------------------
 
-def store_voice_journal(user_id, transcript_text, metadata=None):
+def store_voice_journal(user_id, transcript_text, metadata=None, batch=None):
     doc = {
         "text": transcript_text,
         "timestamp": firestore.SERVER_TIMESTAMP,
@@ -195,7 +480,11 @@ def store_voice_journal(user_id, transcript_text, metadata=None):
     if metadata:
         doc.update(metadata)
 
-    db.collection("voice_journals").document(user_id).collection("entries").add(doc)
+    entries = db.collection("voice_journals").document(user_id).collection("entries")
+    if batch is not None:
+        batch.add(entries, doc)
+    else:
+        entries.add(doc)
 
 # -------------------------
 # 🤖 Routine Optimization Agent Support
@@ -238,7 +527,7 @@ def get_latest_generated_routine(user_id):
 # 🗣 Tip Feedback Loop (Enhanced)
 # -------------------------
 
-def save_tip_feedback(user_id, tip_text, feedback, input_context=None):
+def save_tip_feedback(user_id, tip_text, feedback, input_context=None, batch=None):
     entry = {
         "tip": tip_text,
         "feedback": feedback,
@@ -246,16 +535,20 @@ def save_tip_feedback(user_id, tip_text, feedback, input_context=None):
     }
     if input_context:
         entry["input_context"] = input_context
-    db.collection("tip_feedback").document(user_id).collection("entries").add(entry)
-
-def get_helpful_tips_and_inputs(user_id, limit=10):
-    docs = db.collection("tip_feedback").document(user_id).collection("entries") \
+    entries = db.collection("tip_feedback").document(user_id).collection("entries")
+    if batch is not None:
+        batch.add(entries, entry)
+    else:
+        entries.add(entry)
+
+def helpful_tips_query(user_id, limit, client=None):
+    return (client or db).collection("tip_feedback").document(user_id).collection("entries") \
         .where("feedback", "==", "helpful") \
-        .order_by("timestamp", direction=firestore.Query.DESCENDING).limit(limit).stream()
+        .order_by("timestamp", direction=firestore.Query.DESCENDING).limit(limit)
 
+def helpful_tips(dicts):
     results = []
-    for doc in docs:
-        d = doc.to_dict()
+    for d in dicts:
         tip = d.get("tip")
         context = d.get("input_context")
         if tip and context:
@@ -265,21 +558,23 @@ def get_helpful_tips_and_inputs(user_id, limit=10):
             })
     return results
 
+def get_helpful_tips_and_inputs(user_id, limit=10):
+    return helpful_tips(doc.to_dict() for doc in helpful_tips_query(user_id, limit).stream())
+
 # -------------------------
 # 🧠 XP & Quest System
 # -------------------------
 
-def award_xp(user_id, amount):
-    user_ref = db.collection("users").document(user_id)
-    user_ref.set({
+def award_xp(user_id, amount, batch=None):
+    if batch is not None:
+        batch.award_xp(amount)
+        return
+    update_user_doc(user_id, {
         "xp": firestore.Increment(amount)
-    }, merge=True)
+    })
 
 def get_xp(user_id):
-    doc = db.collection("users").document(user_id).get()
-    if doc.exists:
-        return doc.to_dict().get("xp", 0)
-    return 0
+    return get_user_doc(user_id).get("xp", 0)
 DEFAULT_QUESTS = [
     {"id": "log_3_nights", "title": "Log sleep 3 nights in a row", "xp": 50, "companion": "tracker"},
     {"id": "use_sleep_healer", "title": "Use Sleep Healer twice", "xp": 30, "companion": "healer"},
@@ -291,41 +586,22 @@ DEFAULT_QUESTS = [
 ]
 
 
-def mark_quest_completed(user_id, quest_id):
-    quest_ref = db.collection("users").document(user_id).collection("quests").document(quest_id)
-    if quest_ref.get().exists:
-        return False  # Already completed
-
-    quest = next((q for q in DEFAULT_QUESTS if q["id"] == quest_id), None)
-    if not quest:
-        return False
-
-    quest_ref.set({
-        "title": quest["title"],
-        "xp": quest["xp"],
-        "companion": quest.get("companion", "tracker"),
-        "completed_at": firestore.SERVER_TIMESTAMP
-    })
+def mark_quest_completed(user_id, quest_id, batch=None):
+    if batch is not None:
+        batch.complete_quest(quest_id)
+        return None
 
-    award_xp(user_id, quest["xp"])
-    return True
+    batch = UserWriteBatch(user_id)
+    batch.complete_quest(quest_id)
+    batch.commit()
+    return quest_id in batch.completed_quests
 
 
 def get_user_quests(user_id):
     completed_docs = db.collection("users").document(user_id).collection("quests").stream()
-    completed_ids = set()
-    completed_info = {}
-
-    for doc in completed_docs:
-        data = doc.to_dict()
-        completed_ids.add(doc.id)
-        completed_info[doc.id] = {
-            "completed": True,
-            "title": data.get("title", ""),
-            "xp": data.get("xp", 0),
-            "companion": data.get("companion", "tracker")
-        }
+    return quests_with_completion({doc.id for doc in completed_docs})
 
+def quests_with_completion(completed_ids):
     all_quests = []
     for q in DEFAULT_QUESTS:
         quest_id = q["id"]
@@ -337,6 +613,159 @@ def get_user_quests(user_id):
 
     return all_quests
 
+def get_user_profile(user_id):
+    user = get_user_doc(user_id)
+    return {
+        "streak": user.get("current_streak", 0),
+        "badges": user.get("badges", []),
+        "xp": user.get("xp", 0),
+        "preferred_sleep_time": user.get("preferred_sleep_time", None),
+        "quests": get_user_quests(user_id)
+    }
+
 def get_user_quests_by_companion(user_id, companion):
     all_quests = get_user_quests(user_id)
     return [q for q in all_quests if q.get("companion") == companion]
+
+# -------------------------
+# 🧵 Background Job Status
+# -------------------------
+
+class FirestoreJobStore:
+    """JobQueue records in jobs/{id}, so a status poll can land on any gunicorn worker.
+
+    Each record carries an `expires_at` timestamp `ttl_seconds` after it last changed;
+    configure a Firestore TTL policy on jobs.expires_at to have old records deleted.
+    """
+
+    def __init__(self, ttl_seconds=3600):
+        self.ttl_seconds = ttl_seconds
+
+    def save(self, job):
+        changed_at = job["finished_at"] or job["submitted_at"]
+        db.collection("jobs").document(job["id"]).set({
+            **job,
+            "expires_at": datetime.utcfromtimestamp(changed_at + self.ttl_seconds),
+        })
+
+    def load(self, job_id):
+        snapshot = db.collection("jobs").document(job_id).get()
+        if not snapshot.exists:
+            return None
+        job = snapshot.to_dict()
+        job.pop("expires_at", None)
+        return job
+
+    def prune(self, cutoff):
+        pass  # left to the TTL policy
+
+# -------------------------
+# 📦 Batched Per-request Writes
+# -------------------------
+
+class UserWriteBatch:
+    """Collects the writes one request makes for a user and commits them in one transaction.
+
+    XP awards are summed into a single Increment, quests are only written if they were not
+    completed before (checked inside the transaction), and a queued sleep log updates the
+    user's stats, streak, badges and day/week rollups in the same commit.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.xp = 0
+        self.sleep_log = None
+        self.new_docs = []
+        self.quests = []
+        # Filled in by commit()
+        self.stats = None
+        self.completed_quests = []
+
+    def add(self, collection_ref, doc):
+        self.new_docs.append((collection_ref.document(), doc))
+
+    def add_sleep_log(self, log):
+        self.sleep_log = log
+
+    def award_xp(self, amount):
+        self.xp += amount
+
+    def complete_quest(self, quest_id, when=None):
+        # `when(stats)` is evaluated against the post-commit stats, e.g. for streak quests
+        quest = next((q for q in DEFAULT_QUESTS if q["id"] == quest_id), None)
+        if quest:
+            self.quests.append((quest, when))
+
+    def commit(self):
+        self.stats, self.completed_quests = _commit_user_batch(db.transaction(), self)
+        invalidate_user_doc(self.user_id)
+        metrics.incr("firestore.batch_commits")
+        return self
+
+@firestore.transactional
+def _commit_user_batch(transaction, batch):
+    user_ref = db.collection("users").document(batch.user_id)
+    quests_ref = user_ref.collection("quests")
+
+    # Firestore transactions need every read before the first write
+    stats = None
+    if batch.sleep_log is not None:
+        user_stats_ref = stats_ref(batch.user_id)
+        snapshot = user_stats_ref.get(transaction=transaction)
+        stats = snapshot.to_dict() if snapshot.exists else _build_sleep_stats(batch.user_id)
+        apply_log_to_stats(stats, batch.sleep_log)
+
+    rollups = []
+    if batch.sleep_log is not None:
+        keys = rollup_keys(batch.sleep_log.get("timestamp"))
+        refs = [_rollup_collection(batch.user_id, period).document(doc_id) for period, doc_id, _ in keys]
+        snapshots = {snapshot.reference.path: snapshot
+                     for snapshot in db.get_all(refs, transaction=transaction)}
+        for (period, _, start), ref in zip(keys, refs):
+            snapshot = snapshots.get(ref.path)
+            rollup = snapshot.to_dict() if snapshot is not None and snapshot.exists else empty_rollup(period, start)
+            rollups.append((ref, apply_log_to_rollup(rollup, batch.sleep_log)))
+
+    already_completed = set()
+    if batch.quests:
+        refs = [quests_ref.document(quest["id"]) for quest, _ in batch.quests]
+        for snapshot in db.get_all(refs, transaction=transaction):
+            if snapshot.exists:
+                already_completed.add(snapshot.id)
+
+    completed = []
+    for quest, when in batch.quests:
+        if quest["id"] in already_completed or quest in completed:
+            continue
+        if when is not None and not when(stats):
+            continue
+        completed.append(quest)
+
+    user_fields = {}
+    if stats is not None:
+        entry_ref = db.collection('sleep_logs').document(batch.user_id).collection('entries').document()
+        transaction.set(entry_ref, batch.sleep_log)
+        transaction.set(user_stats_ref, stats)
+        for ref, rollup in rollups:
+            transaction.set(ref, rollup)
+        user_fields["current_streak"] = stats["current_streak"]
+        user_fields["badges"] = list(badges_for_stats(stats))
+
+    for doc_ref, doc in batch.new_docs:
+        transaction.set(doc_ref, doc)
+
+    for quest in completed:
+        transaction.set(quests_ref.document(quest["id"]), {
+            "title": quest["title"],
+            "xp": quest["xp"],
+            "companion": quest.get("companion", "tracker"),
+            "completed_at": firestore.SERVER_TIMESTAMP
+        })
+
+    xp = batch.xp + sum(quest["xp"] for quest in completed)
+    if xp:
+        user_fields["xp"] = firestore.Increment(xp)
+    if user_fields:
+        transaction.set(user_ref, user_fields, merge=True)
+
+    return stats, [quest["id"] for quest in completed]
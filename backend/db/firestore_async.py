@@ -0,0 +1,80 @@
+# db/firestore_async.py
+#
+# Async counterparts of the reads used by async_app.py. Queries and result shaping come
+# from db/firestore.py, so both apps return the same data for the same request.
+
+import asyncio
+
+from firebase_admin import firestore_async, messaging
+
+import firebase_admin_init
+import metrics
+from db import firestore as sync_db
+from db.firestore import (
+    cache_user_doc, helpful_tips, helpful_tips_query, history_fields, history_page,
+    history_query, history_row, push_message, quests_with_completion, sleep_logs_query,
+    stats_ref, ttl_cached_user_doc,
+)
+
+db = firestore_async.client()
+
+
+async def get_user_doc(user_id):
+    # There is no per-request cache here; USER_CACHE_TTL_SECONDS is shared with the sync app
+    cached = ttl_cached_user_doc(user_id)
+    if cached is not None:
+        return cached
+    metrics.incr("user_cache.miss")
+    doc = await db.collection("users").document(user_id).get()
+    data = doc.to_dict() if doc.exists else {}
+    cache_user_doc(user_id, data)
+    return data
+
+
+async def get_sleep_logs(user_id, limit=None, start_after=None, since=None, until=None,
+                         fields=None, descending=False):
+    fields = history_fields(fields)
+    query = history_query(user_id, fields, limit, start_after, since, until, descending, client=db)
+    return [history_row(doc.to_dict(), fields) async for doc in query.stream()]
+
+
+async def get_sleep_logs_page(user_id, limit, start_after=None, since=None, until=None,
+                              fields=None, descending=False):
+    fields = history_fields(fields)
+    query = history_query(user_id, fields, limit + 1, start_after, since, until, descending, client=db)
+    return history_page([(doc.id, doc.to_dict()) async for doc in query.stream()], limit, fields)
+
+
+async def count_sleep_logs(user_id, since=None, until=None):
+    if not since and not until:
+        return (await get_sleep_stats(user_id))["entry_count"]
+    result = await sleep_logs_query(user_id, since, until, client=db).count().get()
+    return int(result[0][0].value)
+
+
+async def get_sleep_stats(user_id):
+    snapshot = await stats_ref(user_id, client=db).get()
+    if snapshot.exists:
+        return snapshot.to_dict()
+    # Users from before stats were kept need a one-off history replay; do it off the loop
+    return await asyncio.to_thread(sync_db.get_sleep_stats, user_id)
+
+
+async def get_user_quests(user_id):
+    completed_docs = db.collection("users").document(user_id).collection("quests").stream()
+    return quests_with_completion({doc.id async for doc in completed_docs})
+
+
+async def get_fcm_token(user_id):
+    return (await get_user_doc(user_id)).get("fcm_token")
+
+
+async def send_push_notification(token, title, body):
+    response = await messaging.send_each_async([push_message(token, title, body)])
+    if response.failure_count:
+        raise response.responses[0].exception
+
+
+async def get_helpful_tips_and_inputs(user_id, limit=10):
+    docs = helpful_tips_query(user_id, limit, client=db).stream()
+    return helpful_tips([doc.to_dict() async for doc in docs])
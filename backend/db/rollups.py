@@ -0,0 +1,105 @@
+# db/rollups.py
+#
+# Per-day and per-week summaries of a user's sleep logs, kept in
+# sleep_rollups/{uid}/days/{YYYY-MM-DD} and sleep_rollups/{uid}/weeks/{YYYY-Www}.
+# Pure functions only; db/firestore.py reads and writes the documents.
+
+from datetime import datetime, timedelta
+
+PERIODS = {"day": "days", "week": "weeks"}
+
+# metric: (stored log field, kind); every metric's mean is kept in "means"
+ROLLUP_METRICS = {
+    "score": ("sleep_score", "number"),
+    "hours": ("hours_slept", "number"),
+    "caffeine": ("caffeine", "number"),
+    "screen": ("screen_time", "number"),
+    "late_screen": ("screentime", "number"),
+    "stress": ("stress_level", "number"),
+    "wake": ("wakeup", "clock"),
+    "caffeine_time": ("caffeinetime", "clock"),
+    "workout": ("workouttime", "clock"),
+    "late_meal": ("latemeal", "flag"),
+}
+# Metrics that also get min/max, and ones that also get a total
+RANGE_METRICS = ["score", "hours"]
+TOTAL_METRICS = ["caffeine", "screen"]
+
+
+def metric_value(log, field, kind):
+    value = log.get(field)
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "clock":
+            hours, minutes = str(value).strip().split(":")[:2]
+            return int(hours) + int(minutes) / 60
+        if kind == "flag":
+            text = str(value).strip().lower()
+            if text in ["yes", "true", "y", "1"]:
+                return 1.0
+            return 0.0 if text in ["no", "false", "n", "0"] else None
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def rollup_keys(timestamp):
+    """[(period, doc id, start date)] for the day and ISO week a log timestamp falls in."""
+    try:
+        day = datetime.fromisoformat(timestamp).date()
+    except (TypeError, ValueError):
+        return []
+    iso_year, iso_week, weekday = day.isocalendar()
+    week_start = day - timedelta(days=weekday - 1)
+    return [
+        ("day", day.isoformat(), day.isoformat()),
+        ("week", f"{iso_year}-W{iso_week:02d}", week_start.isoformat()),
+    ]
+
+
+def empty_rollup(period, start):
+    return {
+        "period": period,
+        "start": start,
+        "count": 0,
+        "sums": {},
+        "counts": {},
+        "means": {},
+        "min": {},
+        "max": {},
+        "totals": {},
+        "mood_counts": {},
+        "emotion_counts": {},
+        "dominant_mood": None,
+        "dominant_emotion": None,
+    }
+
+
+def _dominant(counts):
+    return max(counts, key=counts.get) if counts else None
+
+
+def apply_log_to_rollup(rollup, log):
+    rollup["count"] += 1
+    for metric, (field, kind) in ROLLUP_METRICS.items():
+        value = metric_value(log, field, kind)
+        if value is None:
+            continue
+        rollup["sums"][metric] = rollup["sums"].get(metric, 0.0) + value
+        rollup["counts"][metric] = rollup["counts"].get(metric, 0) + 1
+        rollup["means"][metric] = rollup["sums"][metric] / rollup["counts"][metric]
+        if metric in RANGE_METRICS:
+            rollup["min"][metric] = min(rollup["min"].get(metric, value), value)
+            rollup["max"][metric] = max(rollup["max"].get(metric, value), value)
+        if metric in TOTAL_METRICS:
+            rollup["totals"][metric] = rollup["sums"][metric]
+
+    for key, counts in [("mood", rollup["mood_counts"]), ("emotion", rollup["emotion_counts"])]:
+        label = log.get(key)
+        if label:
+            label = str(label).lower()
+            counts[label] = counts.get(label, 0) + 1
+    rollup["dominant_mood"] = _dominant(rollup["mood_counts"])
+    rollup["dominant_emotion"] = _dominant(rollup["emotion_counts"])
+    return rollup
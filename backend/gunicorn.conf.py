@@ -0,0 +1,10 @@
+# gunicorn.conf.py -- picked up automatically by `gunicorn app:app` from this directory
+
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# INFERENCE_MODE=preload imports the app (and with it every model) once in the master,
+# so forked workers share the model memory instead of each loading a copy
+preload_app = os.getenv("INFERENCE_MODE", "local") == "preload"
@@ -0,0 +1,132 @@
+# inference_client.py
+
+import os
+import secrets
+import threading
+from functools import wraps
+from multiprocessing.connection import Client
+
+import metrics
+
+# INFERENCE_MODE:
+#   local   - every worker loads the models it uses (default)
+#   preload - models are loaded once before gunicorn forks and shared copy-on-write
+#   sidecar - models live in inference_server.py; workers call it over a local socket
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")
+SOCKET_PATH = os.getenv("INFERENCE_SOCKET", "/tmp/sleepwell-inference.sock")
+# multiprocessing.connection unpickles what it receives, so the authkey is all that keeps
+# other local users from running code in the model process. Without INFERENCE_AUTHKEY the
+# sidecar generates a random key at startup and shares it through this 0600 file.
+AUTHKEY_FILE = os.getenv("INFERENCE_AUTHKEY_FILE", SOCKET_PATH + ".key")
+# When the sidecar is unreachable: "local" runs the task in this worker, "error" raises
+SIDECAR_FALLBACK = os.getenv("INFERENCE_SIDECAR_FALLBACK", "local")
+
+_tasks = {}
+_local = threading.local()
+_serving = False
+
+
+class RemoteTaskError(RuntimeError):
+    pass
+
+
+def serve_locally():
+    # Called by the sidecar itself so its tasks never try to call back into the socket
+    global _serving
+    _serving = True
+
+
+def uses_sidecar():
+    return INFERENCE_MODE == "sidecar" and not _serving
+
+
+def _env_authkey():
+    key = os.getenv("INFERENCE_AUTHKEY")
+    return key.encode("utf-8") if key else None
+
+
+def create_authkey():
+    """Sidecar side: INFERENCE_AUTHKEY, or a fresh random key written to AUTHKEY_FILE."""
+    key = _env_authkey()
+    if key:
+        return key
+    key = secrets.token_hex(32).encode("utf-8")
+    if os.path.lexists(AUTHKEY_FILE):
+        os.unlink(AUTHKEY_FILE)
+    # O_EXCL | O_NOFOLLOW: fails instead of writing through a file or symlink planted meanwhile
+    fd = os.open(AUTHKEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def read_authkey():
+    """Worker side: INFERENCE_AUTHKEY, or the key the sidecar wrote to AUTHKEY_FILE."""
+    key = _env_authkey()
+    if key:
+        return key
+    fd = os.open(AUTHKEY_FILE, os.O_RDONLY | os.O_NOFOLLOW)
+    with os.fdopen(fd, "rb") as f:
+        info = os.fstat(f.fileno())
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(f"{AUTHKEY_FILE} must be owned by this user and have mode 0600")
+        return f.read().strip()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        # Read on every new connection, so a restarted sidecar's new key is picked up
+        conn = _local.conn = Client(SOCKET_PATH, family="AF_UNIX", authkey=read_authkey())
+    return conn
+
+
+def _drop_connection():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+def call(name, *args, **kwargs):
+    # One connection per thread, so concurrent requests in a worker never interleave messages
+    try:
+        conn = _connection()
+        conn.send((name, args, kwargs))
+        status, payload = conn.recv()
+    except (OSError, EOFError):
+        _drop_connection()
+        raise
+    if status == "error":
+        raise RemoteTaskError(payload)
+    return payload
+
+
+def run_task(name, args, kwargs):
+    return _tasks[name](*args, **kwargs)
+
+
+def remote_task(name):
+    """Mark a model-backed function that may be served by the inference sidecar."""
+    def decorator(fn):
+        _tasks[name] = fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not uses_sidecar():
+                return fn(*args, **kwargs)
+            try:
+                result = call(name, *args, **kwargs)
+                metrics.incr(f"inference.sidecar.{name}")
+                return result
+            except (OSError, EOFError) as e:
+                metrics.incr("inference.sidecar.unavailable")
+                if SIDECAR_FALLBACK != "local":
+                    raise
+                print(f"⚠️ Inference sidecar unavailable, running '{name}' locally:", e)
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
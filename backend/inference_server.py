@@ -0,0 +1,77 @@
+# inference_server.py
+#
+# Hosts the heavy models in one process for every gunicorn worker on the host:
+#
+#   cd backend && python inference_server.py &
+#   INFERENCE_MODE=sidecar gunicorn app:app -w 4
+
+import os
+import threading
+from multiprocessing.connection import Listener
+
+import inference_client
+from inference_client import SOCKET_PATH, create_authkey, remote_task
+
+inference_client.serve_locally()
+
+# Importing the modules registers their models and @remote_task functions
+import ai.sentiment_analyzer  # noqa: E402,F401
+import ai.stress_detector  # noqa: E402,F401
+import ai.voice_transcriber  # noqa: E402,F401
+import ml.sleep_model  # noqa: E402,F401
+import metrics  # noqa: E402
+from model_registry import registry  # noqa: E402
+
+
+@remote_task("status")
+def status():
+    return {"models": registry.status(), "metrics": metrics.snapshot("inference.server")}
+
+
+def handle(conn):
+    # Each worker thread keeps its own connection; requests on it are answered in order
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                result = ("ok", inference_client.run_task(name, args, kwargs))
+                metrics.incr(f"inference.server.{name}")
+            except Exception as e:
+                print(f"❌ Inference task '{name}' failed:", e)
+                result = ("error", f"{type(e).__name__}: {e}")
+            try:
+                conn.send(result)
+            except (EOFError, OSError):
+                return
+
+
+def main():
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    registry.warm_up(background=False)
+    authkey = create_authkey()
+
+    # The socket is created owner-only; a chmod after bind would leave a window open
+    previous_umask = os.umask(0o077)
+    try:
+        listener = Listener(SOCKET_PATH, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(previous_umask)
+
+    with listener:
+        print(f"✅ Inference server listening on {SOCKET_PATH}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # A client with the wrong authkey must not take the server down
+                print("⚠️ Rejected inference connection:", e)
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
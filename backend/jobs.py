@@ -0,0 +1,116 @@
+# jobs.py
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class MemoryJobStore:
+    """Job records kept in this process; enough for a single worker or a script."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def load(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def prune(self, cutoff):
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["finished_at"] and job["finished_at"] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+class JobQueue:
+    """Bounded background job runner with pollable status.
+
+    At most `max_pending` jobs may be queued or running in this process; beyond that
+    `submit` raises QueueFull so the caller can push back instead of piling work up.
+    Job records go to `store` at every state change, so with a shared store (see
+    db.firestore.FirestoreJobStore) any worker can answer a status poll. Finished jobs
+    are kept for `ttl_seconds` so clients can collect their results.
+    """
+
+    def __init__(self, name, workers=2, max_pending=16, ttl_seconds=3600, store=None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.store = store or MemoryJobStore()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"jobs-{name}")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args, owner=None, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            metrics.incr(f"{self.name}.rejected")
+            raise QueueFull(f"{self.name} queue is full")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "queue": self.name,
+            "owner": owner,
+            "state": "queued",
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "timings_ms": {},
+        }
+        try:
+            self.store.prune(time.time() - self.ttl_seconds)
+            self.store.save(job)
+        except Exception:
+            self._slots.release()
+            raise
+        metrics.incr(f"{self.name}.submitted")
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job_id
+
+    def _save(self, job):
+        try:
+            self.store.save(job)
+        except Exception as e:
+            print(f"❌ {self.name} job {job['id']} status could not be saved:", e)
+
+    def _run(self, job, fn, args, kwargs):
+        started = time.time()
+        metrics.observe(f"{self.name}.queue_wait", started - job["submitted_at"])
+        job["state"] = "running"
+        self._save(job)
+        try:
+            # Jobs may record their own step timings into the dict they are handed
+            job["result"] = fn(*args, timings=job["timings_ms"], **kwargs)
+            job["state"] = "done"
+            metrics.incr(f"{self.name}.done")
+        except Exception as e:
+            print(f"❌ {self.name} job {job['id']} failed:", e)
+            job["error"] = str(e)
+            job["state"] = "failed"
+            metrics.incr(f"{self.name}.failed")
+        finally:
+            job["finished_at"] = time.time()
+            metrics.observe(f"{self.name}.run", job["finished_at"] - started)
+            self._save(job)
+            self._slots.release()
+
+    def get(self, job_id, owner=None):
+        job = self.store.load(job_id)
+        if job is None or job.get("queue") != self.name or (owner is not None and job["owner"] != owner):
+            return None
+        if job["finished_at"] and job["finished_at"] < time.time() - self.ttl_seconds:
+            return None
+        return {k: v for k, v in job.items() if k not in ("owner", "queue")}
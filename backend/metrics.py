@@ -0,0 +1,53 @@
+# metrics.py
+
+import threading
+from collections import defaultdict, deque
+
+# Keep the most recent samples per timer so percentiles track current behaviour
+WINDOW_SIZE = 1024
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, seconds):
+    with _lock:
+        _timings[name].append(float(seconds))
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(name):
+    with _lock:
+        values = sorted(_timings.get(name, ()))
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(_percentile(values, 50) * 1000, 2),
+        "p95_ms": round(_percentile(values, 95) * 1000, 2),
+        "p99_ms": round(_percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+def snapshot(prefix=""):
+    with _lock:
+        counters = {k: v for k, v in _counters.items() if k.startswith(prefix)}
+        timer_names = [k for k in _timings if k.startswith(prefix)]
+    return {
+        "counters": counters,
+        "timings": {name: summarize(name) for name in timer_names},
+    }
@@ -0,0 +1,86 @@
+# ml/compact_forest.py
+
+import numpy as np
+
+
+class CompactForest:
+    """A fitted tree-ensemble regressor flattened into a handful of NumPy arrays.
+
+    Every tree's nodes are concatenated into shared arrays, so prediction walks all trees
+    for all rows at once (one vectorized step per tree level) and the artifact is a plain
+    .npz: no pickle, no scikit-learn import at load time, and predictions identical to the
+    source model's.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        self.feature = feature        # split feature per node, -1 for leaves
+        self.threshold = threshold    # go left when x[feature] <= threshold
+        self.left = left              # global child indices, -1 for leaves
+        self.right = right
+        self.value = value            # prediction per node (used at leaves)
+        self.roots = roots            # root node index of each tree
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.version = None           # set by ml.model_store when loaded from the registry
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestRegressor / ExtraTreesRegressor / DecisionTreeRegressor."""
+        estimators = getattr(model, "estimators_", [model])
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("only single-output regressors can be flattened")
+            is_leaf = tree.children_left < 0
+            roots.append(offset)
+            features.append(np.where(is_leaf, -1, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0])
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+        return cls(
+            feature=np.concatenate(features).astype(np.int16),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def predict(self, X):
+        # scikit-learn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.maximum(feature, 0)] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, self.left[node], self.right[node]), node)
+        return self.value[node].mean(axis=1)
+
+    def save(self, path):
+        np.savez_compressed(path, feature=self.feature, threshold=self.threshold, left=self.left,
+                            right=self.right, value=self.value, roots=self.roots,
+                            max_depth=np.array(self.max_depth), n_features=np.array(self.n_features))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
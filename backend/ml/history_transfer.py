@@ -0,0 +1,261 @@
+# ml/history_transfer.py
+#
+# Moves a user's sleep history in and out as files, for migrations from wearables and for
+# offline analytics:
+#
+#   export  NDJSON (one log per line) or Parquet, generated page by page from Firestore so
+#           memory stays flat however long the history is
+#   import  NDJSON or Parquet rows, validated, scored with the sleep model in batches and
+#           written with batched commits; stats and rollups are rebuilt once at the end
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+import metrics
+from db.firestore import (
+    FIRESTORE_BATCH_LIMIT, iter_sleep_log_pages, rebuild_rollups, rebuild_sleep_stats,
+    sleep_log_ref, write_in_batches,
+)
+from ml.sleep_model import SLEEP_FEATURES, predict_sleep_scores
+
+FORMATS = {"ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+# Columns of an export, in order: entry id and timestamp, then floats, then strings. The id
+# lets re-importing an export overwrite the same entries instead of duplicating them.
+NUMERIC_COLUMNS = SLEEP_FEATURES + ["sleep_score"]
+TEXT_COLUMNS = ["mood", "emotion", "journal", "wakeup", "screentime", "caffeinetime", "workouttime", "latemeal"]
+EXPORT_COLUMNS = ["id", "timestamp"] + NUMERIC_COLUMNS + TEXT_COLUMNS
+ENTRY_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+EXPORT_PAGE_SIZE = 1000
+PARQUET_ROW_GROUP = 10000
+TEXT_MAX_CHARS = 10000      # keeps each entry far below Firestore's 1 MiB document limit
+IMPORT_MAX_ERRORS = 50      # invalid rows listed in an import result; the rest are only counted
+
+# -------------------------
+# 📤 Export
+# -------------------------
+
+def _export_row(doc_id, d):
+    row = {"id": doc_id, "timestamp": d.get("timestamp")}
+    for column in NUMERIC_COLUMNS:
+        value = d.get(column)
+        row[column] = float(value) if isinstance(value, (int, float)) else None
+    for column in TEXT_COLUMNS:
+        value = d.get(column)
+        row[column] = None if value is None else str(value)
+    return row
+
+def _export_pages(user_id):
+    fields = EXPORT_COLUMNS[1:]
+    for page in iter_sleep_log_pages(user_id, EXPORT_PAGE_SIZE, fields=fields):
+        yield [_export_row(snapshot.id, snapshot.to_dict()) for snapshot in page]
+
+def _ndjson_chunks(pages):
+    for rows in pages:
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+class _ByteSink:
+    """Write target for ParquetWriter that hands out bytes as soon as they are written."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_chunks(pages):
+    # Imported here so NDJSON-only deployments and worker startup do not pay for pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("id", pa.string()), ("timestamp", pa.string())]
+                       + [(column, pa.float64()) for column in NUMERIC_COLUMNS]
+                       + [(column, pa.string()) for column in TEXT_COLUMNS])
+    sink = _ByteSink()
+    pending = []
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+        for rows in pages:
+            pending.extend(rows)
+            if len(pending) >= PARQUET_ROW_GROUP:
+                writer.write_table(pa.Table.from_pylist(pending, schema=schema))
+                pending = []
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_pylist(pending, schema=schema))
+    # Closing the writer appends the footer
+    yield sink.drain()
+
+def export_sleep_logs(user_id, file_format="ndjson"):
+    """Lazily yield the user's history, oldest first, as chunks of an NDJSON or Parquet file."""
+    pages = _export_pages(user_id)
+    return _parquet_chunks(pages) if file_format == "parquet" else _ndjson_chunks(pages)
+
+# -------------------------
+# 📥 Import
+# -------------------------
+
+def _iter_ndjson_rows(path):
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None  # reported as an invalid row
+
+def _iter_parquet_rows(path):
+    import pyarrow.parquet as pq
+
+    with pq.ParquetFile(path) as parquet:
+        for batch in parquet.iter_batches(batch_size=FIRESTORE_BATCH_LIMIT):
+            yield from batch.to_pylist()
+
+def _parse_timestamp(value):
+    # Entries store naive UTC ISO strings; anything with an offset is converted to UTC
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+def validate_import_row(row):
+    """Return (log, None) for a usable row or (None, reason) for one that is skipped.
+
+    Any sleep_score in the row is ignored; imported logs are scored with the current model.
+    """
+    if not isinstance(row, dict):
+        return None, "row must be a JSON object"
+    if row.get("id") is not None and not ENTRY_ID_PATTERN.fullmatch(str(row["id"])):
+        return None, "'id' must be 1-128 letters, digits, '_' or '-'"
+    if row.get("timestamp") is None:
+        return None, "missing 'timestamp'"
+    try:
+        log = {"timestamp": _parse_timestamp(row["timestamp"])}
+    except (TypeError, ValueError):
+        return None, "'timestamp' must be an ISO 8601 date-time"
+    if log["timestamp"] > datetime.utcnow().isoformat():
+        return None, "'timestamp' is in the future"
+
+    for feature in SLEEP_FEATURES:
+        value = row.get(feature)
+        if value is None:
+            return None, f"missing '{feature}'"
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None, f"'{feature}' must be a number"
+        if not math.isfinite(value) or value < 0:
+            return None, f"'{feature}' must be a non-negative number"
+        log[feature] = value
+    if log["hours_slept"] > 24 or log["screen_time"] > 24:
+        return None, "'hours_slept' and 'screen_time' must be at most 24"
+
+    for column in TEXT_COLUMNS:
+        if row.get(column) is not None:
+            log[column] = str(row[column])
+            if len(log[column]) > TEXT_MAX_CHARS:
+                return None, f"'{column}' is longer than {TEXT_MAX_CHARS} characters"
+    log.setdefault("mood", "neutral")
+    log.setdefault("journal", "")
+    return log, None
+
+def _import_doc_id(row, log):
+    # Exports carry the entry id, so a round trip rewrites the same entries; rows from other
+    # sources are keyed by timestamp, so importing the same file twice does not duplicate them
+    if row.get("id") is not None:
+        return str(row["id"])
+    return "import-" + hashlib.sha1(log["timestamp"].encode()).hexdigest()[:20]
+
+def import_sleep_logs(user_id, path, file_format, timings=None):
+    """Import a file of sleep logs for the user, then delete it. Usable as a JobQueue job.
+
+    Rows are read, validated and scored one batch at a time; each batch's valid logs go out
+    in one batched commit. Invalid rows are skipped and the first IMPORT_MAX_ERRORS are
+    listed in the result with their 1-based row number. Rows that map to an entry an
+    earlier row of the file already wrote (same id, or same timestamp without an id) are
+    skipped and counted as duplicates.
+    """
+    timings = timings if timings is not None else {}
+    imported = invalid = duplicates = 0
+    errors = []
+    seen = {}  # entry id -> row number that wrote it
+    score_seconds = write_seconds = 0.0
+
+    try:
+        rows = enumerate(_iter_parquet_rows(path) if file_format == "parquet" else _iter_ndjson_rows(path), 1)
+        while True:
+            chunk = list(islice(rows, FIRESTORE_BATCH_LIMIT))
+            if not chunk:
+                break
+            logs = []
+            for number, row in chunk:
+                log, error = validate_import_row(row)
+                if error is None:
+                    doc_id = _import_doc_id(row, log)
+                    if doc_id not in seen:
+                        seen[doc_id] = number
+                        logs.append((doc_id, log))
+                        continue
+                    duplicates += 1
+                    error = f"duplicate of row {seen[doc_id]}"
+                else:
+                    invalid += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"row": number, "error": error})
+            if not logs:
+                continue
+
+            started = time.perf_counter()
+            scores = predict_sleep_scores([log for _, log in logs])
+            score_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            imported += write_in_batches(
+                ("set", sleep_log_ref(user_id, doc_id), {**log, "user_id": user_id, "sleep_score": score})
+                for (doc_id, log), score in zip(logs, scores)
+            )
+            write_seconds += time.perf_counter() - started
+    finally:
+        os.remove(path)
+
+    timings["score"] = round(score_seconds * 1000, 1)
+    timings["write"] = round(write_seconds * 1000, 1)
+    result = {"imported": imported, "invalid": invalid, "duplicates": duplicates, "errors": errors}
+    if imported:
+        started = time.perf_counter()
+        # Rollups before stats, as in rescore_user_history (insights are cached by stats version)
+        result["rollups"] = rebuild_rollups(user_id)
+        result["entry_count"] = rebuild_sleep_stats(user_id)["entry_count"]
+        timings["rebuild"] = round((time.perf_counter() - started) * 1000, 1)
+
+    metrics.incr("import.logs_imported", imported)
+    metrics.incr("import.logs_invalid", invalid)
+    metrics.incr("import.logs_duplicate", duplicates)
+    return result
@@ -0,0 +1,224 @@
+# ml/insights_engine.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from db.firestore import get_rollups, rebuild_rollups
+
+INSIGHT_WINDOWS = (7, 14, 30, 90)
+DEFAULT_WINDOW = int(os.getenv("INSIGHTS_DEFAULT_WINDOW", "30"))
+if DEFAULT_WINDOW not in INSIGHT_WINDOWS:
+    # Otherwise every /get_insights call without ?window= would answer 400
+    raise ValueError(f"INSIGHTS_DEFAULT_WINDOW must be one of {INSIGHT_WINDOWS}, got {DEFAULT_WINDOW}")
+CACHE_SIZE = int(os.getenv("INSIGHTS_CACHE_SIZE", "1024"))
+
+MIN_LOGS = 5            # fewer logs than this in a window gives no insights
+MIN_BUCKET_DAYS = 2     # scored days needed on each side of a split to compare them
+MIN_DELTA = 1.0         # score difference (points) worth telling the user about
+MIN_WEEKLY_TREND = 0.5  # score change per week worth telling the user about
+
+# Each row of the frame is one day from the daily rollups (db/rollups.py), holding that
+# day's mean of every metric, so several logs on one day count once.
+# column: (split threshold, "on days ..." at/below it, "on days ..." above it)
+FACTORS = {
+    "hours": (7, "with 7 hours of sleep or less", "with more than 7 hours of sleep"),
+    "caffeine": (2, "with 2 or fewer cups of caffeine", "with more than 2 cups of caffeine"),
+    "screen": (2, "with 2 hours of screen time or less", "with more than 2 hours of screen time"),
+    "late_screen": (1, "with at most an hour of screens after 9 PM", "with more than an hour of screens after 9 PM"),
+    "stress": (30, "with low stress", "with moderate or high stress"),
+    "wake": (8, "when you wake by 8 AM", "when you wake after 8 AM"),
+    "caffeine_time": (14, "when your last caffeine is by 2 PM", "when you have caffeine after 2 PM"),
+    "workout": (19, "when you work out by 7 PM", "when you work out after 7 PM"),
+    "late_meal": (0.5, "without a heavy meal before bed", "with a heavy meal close to bedtime"),
+}
+COLUMNS = ["score"] + list(FACTORS)
+
+_cache = OrderedDict()       # user_id -> _UserFrame
+_cache_lock = threading.Lock()
+
+
+class _UserFrame:
+    def __init__(self, version, frame):
+        self.version = version
+        self.frame = frame
+        self.results = {}    # (window_days, date) -> result
+
+
+def build_frame(rollups):
+    """Columnar frame of daily rollups: a timestamp, the day's log count and one float column
+    per COLUMNS entry."""
+    if not rollups:
+        return pd.DataFrame(columns=["timestamp", "logs"] + COLUMNS)
+    frame = pd.DataFrame([r.get("means", {}) for r in rollups]).reindex(columns=COLUMNS).astype(float)
+    frame.insert(0, "logs", [r.get("count", 0) for r in rollups])
+    frame.insert(0, "timestamp", pd.to_datetime([r["start"] for r in rollups]))
+    return frame.sort_values("timestamp").reset_index(drop=True)
+
+
+def _as_dict(values):
+    return {name: None if np.isnan(v) else round(float(v), 3) for name, v in values.items()}
+
+
+def _trend_slopes(days, values):
+    # Least-squares slope of every column against time, skipping each column's NaNs
+    mask = ~np.isnan(values)
+    count = mask.sum(axis=0)
+    t = np.where(mask, days[:, None], 0.0)
+    y = np.where(mask, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_mean = t.sum(axis=0) / count
+        y_mean = y.sum(axis=0) / count
+        dt = np.where(mask, days[:, None] - t_mean, 0.0)
+        dy = np.where(mask, values - y_mean, 0.0)
+        return (dt * dy).sum(axis=0) / (dt * dt).sum(axis=0)
+
+
+def _score_deltas(scored):
+    # Mean score at/below vs above each factor's threshold, for all factors at once
+    factors = list(FACTORS)
+    X = scored[factors].to_numpy(dtype=float)
+    score = scored["score"].to_numpy(dtype=float)
+    thresholds = np.array([FACTORS[f][0] for f in factors], dtype=float)
+    known = ~np.isnan(X)
+    high = known & (X > thresholds)
+    low = known & ~high
+    high_count, low_count = high.sum(axis=0), low.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        high_mean = score @ high / high_count
+        low_mean = score @ low / low_count
+    return {
+        factor: {
+            "low_count": int(low_count[i]),
+            "high_count": int(high_count[i]),
+            "low_mean": None if np.isnan(low_mean[i]) else round(float(low_mean[i]), 2),
+            "high_mean": None if np.isnan(high_mean[i]) else round(float(high_mean[i]), 2),
+        }
+        for i, factor in enumerate(factors)
+    }
+
+
+def _describe(deltas, trend, window_days):
+    insights = []
+    comparable = [
+        (factor, d["low_mean"] - d["high_mean"]) for factor, d in deltas.items()
+        if d["low_count"] >= MIN_BUCKET_DAYS and d["high_count"] >= MIN_BUCKET_DAYS
+    ]
+    for factor, diff in sorted(comparable, key=lambda item: -abs(item[1])):
+        if abs(diff) < MIN_DELTA:
+            break
+        low_label, high_label = FACTORS[factor][1:]
+        direction = "higher" if diff > 0 else "lower"
+        insights.append(
+            f"Your sleep score averages {abs(diff):.1f} points {direction} on days {low_label} "
+            f"than on days {high_label}."
+        )
+
+    weekly = trend.get("score")
+    if weekly is not None and abs(weekly) >= MIN_WEEKLY_TREND:
+        direction = "up" if weekly > 0 else "down"
+        insights.append(
+            f"Over the last {window_days} days your sleep score is trending {direction} "
+            f"by {abs(weekly):.1f} points a week."
+        )
+    return insights
+
+
+def _window_start(window_days, today=None):
+    # The window is today plus the `window_days - 1` days before it
+    today = today or datetime.utcnow().date()
+    return today - timedelta(days=window_days - 1)
+
+
+def analyze_window(frame, window_days, today=None):
+    """Insights and supporting statistics for the last `window_days` days."""
+    window = frame[frame["timestamp"] >= pd.Timestamp(_window_start(window_days, today))]
+    if window["logs"].sum() < MIN_LOGS:
+        return {"message": "Not enough data to generate insights.", "window_days": window_days}
+
+    scored = window.dropna(subset=["score"])
+    values = window[COLUMNS]
+    days = ((window["timestamp"] - window["timestamp"].iloc[0]).dt.total_seconds() / 86400).to_numpy()
+    trend = _as_dict(pd.Series(_trend_slopes(days, values.to_numpy(dtype=float)) * 7, index=COLUMNS))
+    daily = window.set_index("timestamp")[COLUMNS]
+    deltas = _score_deltas(scored)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Factors that never vary in the window have no correlation (NaN -> None)
+        correlation = _as_dict(scored[list(FACTORS)].corrwith(scored["score"]))
+
+    return {
+        "window_days": window_days,
+        "insights": _describe(deltas, trend, window_days) or ["No strong correlations found. Keep tracking!"],
+        "stats": {
+            "logs": int(window["logs"].sum()),
+            "days": int(len(window)),
+            "scored_days": int(len(scored)),
+            "mean": _as_dict(values.mean()),
+            "rolling_7d": _as_dict(daily.rolling("7D").mean().iloc[-1]),
+            "trend_per_week": trend,
+            "correlation": correlation,
+            "score_delta": deltas,
+        },
+    }
+
+
+def _stats_version(stats):
+    # Changes whenever a log is added or rescored, which is when cached frames go stale
+    return stats.get("entry_count"), stats.get("last_timestamp"), stats.get("score_sum")
+
+
+def _load_frame(user_id, stats):
+    # At most max(INSIGHT_WINDOWS) small documents, however long the history is
+    since = _window_start(max(INSIGHT_WINDOWS)).isoformat()
+    rollups = get_rollups(user_id, "day", since=since)
+    if not rollups and stats.get("entry_count", 0) > 0 and not get_rollups(user_id, "day", limit=1):
+        # Logs that predate rollups and were never backfilled (backfill_rollups.py), the
+        # same way get_sleep_stats builds missing stats on first read
+        print(f"⚠️ No rollups for user {user_id} with {stats['entry_count']} logs, rebuilding them")
+        metrics.incr("insights.rollups_rebuilt")
+        rebuild_rollups(user_id)
+        rollups = get_rollups(user_id, "day", since=since)
+    return build_frame(rollups)
+
+
+def get_user_insights(user_id, stats, window_days=DEFAULT_WINDOW):
+    """Insights for the user's last `window_days` days.
+
+    The daily rollups for the largest window are loaded into one frame and kept until their
+    sleep stats change, so switching windows or reloading the page does not re-read them.
+    """
+    version = _stats_version(stats)
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry is not None and entry.version == version:
+            _cache.move_to_end(user_id)
+            result = entry.results.get((window_days, datetime.utcnow().date()))
+            if result is not None:
+                metrics.incr("insights.cache_hit")
+                return result
+        else:
+            entry = None
+
+    metrics.incr("insights.cache_miss")
+    started = time.perf_counter()
+    if entry is None:
+        entry = _UserFrame(version, _load_frame(user_id, stats))
+    result = analyze_window(entry.frame, window_days)
+    metrics.observe("insights.compute", time.perf_counter() - started)
+
+    today = datetime.utcnow().date()
+    with _cache_lock:
+        # Windows are relative to today, so results from earlier days are dropped
+        entry.results = {key: r for key, r in entry.results.items() if key[1] == today}
+        entry.results[(window_days, today)] = result
+        _cache[user_id] = entry
+        _cache.move_to_end(user_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
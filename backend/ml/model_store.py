@@ -0,0 +1,173 @@
+# ml/model_store.py
+#
+# Versioned sleep score models:
+#
+#   ml/models/registry.json      {"active": "v2", "versions": {"v1": {...meta}, "v2": {...}}}
+#   ml/models/<version>/model.npz   CompactForest arrays
+#   ml/models/<version>/meta.json   training params, holdout error, size, load time, latency
+#   ml/models/<version>/report.json search results and comparison with the version it replaced
+#
+# The server loads SLEEP_MODEL_VERSION if set, otherwise the registry's active version, and
+# picks up a newly activated version without a restart (see ml/sleep_model.py):
+#
+#   cd backend && python -m ml.model_store list
+#   cd backend && python -m ml.model_store activate v2
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from ml.compact_forest import CompactForest
+
+MODELS_DIR = os.getenv("SLEEP_MODEL_DIR", os.path.join(os.path.dirname(__file__), "models"))
+REGISTRY_PATH = os.path.join(MODELS_DIR, "registry.json")
+MODEL_FILE = "model.npz"
+REPORT_FILE = "report.json"
+
+
+def _write_json(path, data):
+    # Atomic replace, so a worker polling the registry never reads a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def read_registry():
+    try:
+        with open(REGISTRY_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"active": None, "versions": {}}
+
+
+def active_version():
+    version = os.getenv("SLEEP_MODEL_VERSION") or read_registry()["active"]
+    if not version:
+        raise LookupError(f"No sleep model version is active in {REGISTRY_PATH}")
+    return version
+
+
+def version_dir(version):
+    if not re.fullmatch(r"[\w.-]+", version):
+        raise ValueError(f"Invalid model version '{version}'")
+    return os.path.join(MODELS_DIR, version)
+
+
+def load_version(version):
+    model = CompactForest.load(os.path.join(version_dir(version), MODEL_FILE))
+    model.version = version
+    return model
+
+
+def next_version():
+    numbers = [int(v[1:]) for v in read_registry()["versions"] if re.fullmatch(r"v\d+", v)]
+    return f"v{max(numbers, default=0) + 1}"
+
+
+def save_version(model, meta, version=None, activate=False):
+    """Store a CompactForest as a new version and return its name.
+
+    The artifact's size, load time and prediction latency are measured here and added to
+    `meta`, so every version in the registry carries comparable numbers.
+    """
+    version = version or next_version()
+    path = version_dir(version)
+    os.makedirs(path, exist_ok=False)
+    model_path = os.path.join(path, MODEL_FILE)
+    model.save(model_path)
+
+    meta = {
+        **meta,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "artifact_bytes": os.path.getsize(model_path),
+        "trees": model.n_trees,
+        "nodes": model.n_nodes,
+        "max_depth": model.max_depth,
+        **measure_artifact(model_path),
+    }
+    _write_json(os.path.join(path, "meta.json"), meta)
+
+    registry = read_registry()
+    registry["versions"][version] = meta
+    if activate or not registry["active"]:
+        registry["active"] = version
+    _write_json(REGISTRY_PATH, registry)
+    return version
+
+
+def measure_artifact(model_path, repeats=200, batch_rows=1000):
+    started = time.perf_counter()
+    model = CompactForest.load(model_path)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    X = np.random.default_rng(0).uniform(0, 10, size=(batch_rows, model.n_features))
+    single = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        model.predict(X[i % batch_rows:i % batch_rows + 1])
+        single.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    model.predict(X)
+    batch_seconds = time.perf_counter() - started
+    return {
+        "load_ms": round(load_ms, 2),
+        "predict_single_us_p50": round(float(np.median(single)) * 1e6, 1),
+        "predict_batch_us_per_row": round(batch_seconds / batch_rows * 1e6, 2),
+    }
+
+
+def holdout_metrics(model, X, y):
+    errors = model.predict(X) - y
+    return {
+        "rows": len(y),
+        "mae": round(float(np.abs(errors).mean()), 3),
+        "rmse": round(float(np.sqrt((errors ** 2).mean())), 3),
+    }
+
+
+def write_report(version, report):
+    path = os.path.join(version_dir(version), REPORT_FILE)
+    _write_json(path, report)
+    return path
+
+
+def activate(version):
+    registry = read_registry()
+    if version not in registry["versions"]:
+        raise LookupError(f"Unknown model version '{version}'")
+    registry["active"] = version
+    _write_json(REGISTRY_PATH, registry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sleep score model versions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    activate_parser = sub.add_parser("activate")
+    activate_parser.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "activate":
+        activate(args.version)
+        print(f"✅ Activated {args.version}; servers switch on their next reload check")
+        return
+    registry = read_registry()
+    for version, meta in sorted(registry["versions"].items(), key=lambda item: item[1].get("created_at", "")):
+        marker = "*" if version == registry["active"] else " "
+        holdout = meta.get("holdout", {})
+        print(f"{marker} {version:6} mae={holdout.get('mae')} bytes={meta.get('artifact_bytes')} "
+              f"load_ms={meta.get('load_ms')} single_us={meta.get('predict_single_us_p50')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,158 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 
-model = RandomForestRegressor()
+import metrics
+
+FEATURES = ['hours_slept', 'screen_time', 'caffeine', 'stress_level']
+
+# Below this many logs a closed-form ridge fit is as good as a forest and far cheaper
+SMALL_HISTORY = int(os.getenv("PREDICTOR_SMALL_HISTORY", "30"))
+MODEL_CACHE_SIZE = int(os.getenv("PREDICTOR_CACHE_SIZE", "1024"))
+RIDGE_ALPHA = 1.0
+
+# Signed-in users: a model fitted on their stored logs, kept until their sleep stats change.
+# Anonymous callers: keyed by the content of the logs they sent, in a separate, smaller
+# cache so one-off requests cannot push out per-user models.
+_user_cache = OrderedDict()  # user id -> _CachedModel
+_anon_cache = OrderedDict()  # content hash -> _CachedModel
+ANON_CACHE_SIZE = int(os.getenv("PREDICTOR_ANON_CACHE_SIZE", "64"))
+_cache_lock = threading.Lock()
+
+
+class RidgeModel:
+    """Ridge regression kept as running sufficient statistics, so new rows can be added
+    without revisiting old ones."""
+
+    def __init__(self, n_features, alpha=RIDGE_ALPHA):
+        size = n_features + 1  # + intercept column
+        self.alpha = alpha
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.coef = np.zeros(size)
+
+    @staticmethod
+    def _with_intercept(X):
+        return np.hstack([X, np.ones((X.shape[0], 1))])
+
+    def partial_fit(self, X, y):
+        Xb = self._with_intercept(X)
+        self.xtx += Xb.T @ Xb
+        self.xty += Xb.T @ y
+        penalty = self.alpha * np.eye(len(self.xty))
+        penalty[-1, -1] = 0.0  # do not shrink the intercept
+        self.coef = np.linalg.solve(self.xtx + penalty, self.xty)
+        return self
+
+    def predict(self, X):
+        return self._with_intercept(X) @ self.coef
+
+
+class _CachedModel:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.model = None
+        self.version = None   # stats version the model was fitted at (signed-in users)
+        self.latest = None    # feature row of the newest log, the input for the prediction
+
+
+def _to_arrays(logs):
+    X = np.array([[float(log.get(f, 0) or 0) for f in FEATURES] for log in logs], dtype=float)
+    y = np.array([float(log.get('sleep_score', 0) or 0) for log in logs], dtype=float)
+    return X, y
+
+
+def _get_entry(cache, key, max_size):
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None:
+            entry = cache[key] = _CachedModel()
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+        return entry
+
+
+def _fit(X, y):
+    metrics.incr("predictor.full_fit")
+    if len(y) < SMALL_HISTORY:
+        return RidgeModel(X.shape[1]).partial_fit(X, y)
+    from sklearn.ensemble import RandomForestRegressor  # deferred: importing sklearn is slow
+    return RandomForestRegressor(n_estimators=50, random_state=42, n_jobs=1).fit(X, y)
+
 
 def predict_next_score(logs):
+    """Predict from the logs an anonymous caller sent with the request."""
     if len(logs) < 3:
         return 75  # fallback default score
 
-    # Extract features and labels from logs
-    X = []
-    y = []
-    for log in logs:
-        X.append([
-            float(log['hours_slept']),
-            float(log['screen_time']),
-            float(log['caffeine']),
-            float(log['stress_level'])
-        ])
-        y.append(float(log['sleep_score']))
-
-    model.fit(X, y)
-    # Predict next based on latest log
-    next_input = X[-1]
-    return round(model.predict([next_input])[0], 2)
\ No newline at end of file
+    X, y = _to_arrays(logs)
+    entry = _get_entry(_anon_cache, hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest(), ANON_CACHE_SIZE)
+    with entry.lock:
+        if entry.model is None:
+            entry.model = _fit(X, y)
+        else:
+            metrics.incr("predictor.cache_hit")
+        # Predict next based on latest log
+        return round(float(entry.model.predict(X[-1:])[0]), 2)
+
+
+def _stats_version(stats):
+    # Changes whenever a log is added or rescored (same signal the insights cache uses)
+    return stats.get("entry_count"), stats.get("last_timestamp"), stats.get("score_sum")
+
+
+def _stored_logs(user_id, after=None):
+    from db.firestore import FIRESTORE_BATCH_LIMIT, iter_sleep_log_pages
+
+    logs = []
+    for page in iter_sleep_log_pages(user_id, FIRESTORE_BATCH_LIMIT, fields=FEATURES + ['sleep_score'], after=after):
+        logs.extend(snapshot.to_dict() for snapshot in page)
+    return logs
+
+
+def _refresh(entry, user_id, version):
+    old = entry.version
+    if isinstance(entry.model, RidgeModel) and old is not None and old[1] \
+            and version[0] < SMALL_HISTORY and version[0] > old[0]:
+        # Only logs newer than the last fit are read; they are folded in if they account
+        # for the whole change (nothing older was added or rescored meanwhile)
+        new_logs = _stored_logs(user_id, after=old[1])
+        scored = [log for log in new_logs if log.get('sleep_score') is not None]
+        if new_logs and len(new_logs) == version[0] - old[0] \
+                and np.isclose((old[2] or 0) + sum(float(log['sleep_score']) for log in scored), version[2] or 0):
+            if scored:
+                entry.model.partial_fit(*_to_arrays(scored))
+            entry.latest = _to_arrays(new_logs[-1:])[0]
+            entry.version = version
+            metrics.incr("predictor.incremental_fit")
+            return
+
+    logs = _stored_logs(user_id)
+    # Logs stored without a score (sleep model unavailable at the time) are not trained on
+    scored = [log for log in logs if log.get('sleep_score') is not None]
+    entry.model = _fit(*_to_arrays(scored)) if len(scored) >= 3 else None
+    entry.latest = _to_arrays(logs[-1:])[0] if logs else None
+    entry.version = version
+
+
+def predict_user_next_score(user_id, stats):
+    """Predict from the user's stored logs; `stats` is their sleep_stats document."""
+    if stats.get("entry_count", 0) < 3:
+        return 75  # fallback default score
+
+    version = _stats_version(stats)
+    entry = _get_entry(_user_cache, user_id, MODEL_CACHE_SIZE)
+    # Each cached model is only touched under its own lock, so requests for different
+    # users never wait on each other and the same user's model is never fit twice at once
+    with entry.lock:
+        if entry.version == version:
+            metrics.incr("predictor.cache_hit")
+        else:
+            _refresh(entry, user_id, version)
+        if entry.model is None or entry.latest is None:
+            return 75
+        return round(float(entry.model.predict(entry.latest)[0]), 2)
@@ -0,0 +1,73 @@
+# ml/rescore.py
+
+import time
+
+from firebase_admin import firestore
+
+import metrics
+from db.firestore import (
+    FIRESTORE_BATCH_LIMIT, iter_sleep_log_pages, rebuild_rollups, rebuild_sleep_stats, write_in_batches,
+)
+from ml.sleep_model import SLEEP_FEATURES, feature_matrix, predict_sleep_scores
+
+
+def _scorable(row):
+    try:
+        feature_matrix([row])
+        return True
+    except ValueError:
+        return False
+
+
+def _clear_fallback(row):
+    return {"sleep_score_fallback": firestore.DELETE_FIELD} if "sleep_score_fallback" in row else {}
+
+
+def rescore_user_history(user_id, timings=None):
+    """Rewrite sleep_score on all of a user's logs with the current sleep model.
+
+    Each page of entries is scored with one predict call and its changed scores are written
+    with one batched commit; stats and rollups are rebuilt at the end so they match.
+    Usable as a JobQueue job (`timings` receives per-step durations).
+    """
+    timings = timings if timings is not None else {}
+    scanned = updated = skipped = 0
+    score_seconds = write_seconds = 0.0
+
+    for page in iter_sleep_log_pages(user_id, FIRESTORE_BATCH_LIMIT, fields=SLEEP_FEATURES + ["sleep_score", "sleep_score_fallback"]):
+        scanned += len(page)
+        rows = [(snapshot, snapshot.to_dict()) for snapshot in page]
+        # A missing or non-numeric feature would fail the whole page's predict call
+        usable = [(snapshot, row) for snapshot, row in rows if _scorable(row)]
+        skipped += len(rows) - len(usable)
+
+        started = time.perf_counter()
+        scores = predict_sleep_scores([row for _, row in usable])
+        score_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        updated += write_in_batches(
+            ("update", snapshot.reference, {"sleep_score": score, **_clear_fallback(row)})
+            for (snapshot, row), score in zip(usable, scores)
+            if row.get("sleep_score") != score or row.get("sleep_score_fallback")
+        )
+        write_seconds += time.perf_counter() - started
+
+    # Rollups first: insights are cached by stats version, so rebuilding stats last keeps a
+    # concurrent /get_insights from caching old rollups under the new version
+    started = time.perf_counter()
+    rollups = rebuild_rollups(user_id)
+    stats = rebuild_sleep_stats(user_id)
+    timings["score"] = round(score_seconds * 1000, 1)
+    timings["write"] = round(write_seconds * 1000, 1)
+    timings["rebuild"] = round((time.perf_counter() - started) * 1000, 1)
+
+    metrics.incr("rescore.logs_scanned", scanned)
+    metrics.incr("rescore.logs_updated", updated)
+    return {
+        "scanned": scanned,
+        "updated": updated,
+        "skipped": skipped,
+        "entry_count": stats["entry_count"],
+        "rollups": rollups,
+    }
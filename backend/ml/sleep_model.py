@@ -1,15 +1,81 @@
-import joblib
 import os
+import threading
+import time
 
-# Dynamically build the path to sleep_model.pkl (same folder)
-model_path = os.path.join(os.path.dirname(__file__), 'sleep_model.pkl')
-model = joblib.load(model_path)
+import numpy as np
 
+import metrics
+from model_registry import registry
+from inference_client import remote_task
+from ml import model_store
+
+# Column order the model was trained with (see train_model.py)
+SLEEP_FEATURES = ['hours_slept', 'screen_time', 'caffeine', 'stress_level']
+
+# How often a loaded model checks whether another version was activated in the registry
+RELOAD_CHECK_SECONDS = float(os.getenv("SLEEP_MODEL_RELOAD_SECONDS", "30"))
+
+_next_reload_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def _load_sleep_model():
+    # SLEEP_MODEL_VERSION pins a version; otherwise the registry's active one is used
+    return model_store.load_version(model_store.active_version())
+
+registry.register("sleep_model", _load_sleep_model)
+
+
+def _current_model():
+    global _next_reload_check
+    if registry.is_ready("sleep_model") and time.monotonic() >= _next_reload_check \
+            and _reload_lock.acquire(blocking=False):
+        # One thread checks; the rest keep scoring with the model they have
+        try:
+            _next_reload_check = time.monotonic() + RELOAD_CHECK_SECONDS
+            loaded = registry.get("sleep_model").version
+            wanted = model_store.active_version()
+            if wanted != loaded:
+                registry.reload("sleep_model")
+                metrics.incr("sleep_model.swapped")
+                print(f"🔁 Sleep model switched from {loaded} to {wanted}")
+        except Exception as e:
+            print("⚠️ Sleep model reload check failed, keeping the current version:", e)
+        finally:
+            _reload_lock.release()
+    return registry.get("sleep_model")
+
+
+def feature_matrix(rows):
+    """(n, 4) float array of SLEEP_FEATURES from dicts; raises ValueError naming the first bad row."""
+    try:
+        X = np.array([[float(row[f]) for f in SLEEP_FEATURES] for row in rows], dtype=float)
+    except (KeyError, TypeError, ValueError):
+        X = None
+    if X is not None:
+        bad = np.flatnonzero(~np.isfinite(X).all(axis=1))
+        if len(bad):
+            raise ValueError(f"row {bad[0]}: features must be finite numbers")
+        return X
+    for i, row in enumerate(rows):
+        for f in SLEEP_FEATURES:
+            try:
+                float(row[f])
+            except KeyError:
+                raise ValueError(f"row {i}: missing '{f}'")
+            except (TypeError, ValueError):
+                raise ValueError(f"row {i}: '{f}' must be a number")
+    raise ValueError("rows must be objects with numeric " + ", ".join(SLEEP_FEATURES))
+
+
+@remote_task("predict_sleep_scores")
+def predict_sleep_scores(rows):
+    """Score many logs with one vectorized model.predict call; returns a list of floats."""
+    if len(rows) == 0:
+        return []
+    return np.round(_current_model().predict(feature_matrix(rows)), 2).tolist()
+
+
+@remote_task("predict_sleep_score")
 def predict_sleep_score(data):
-    features = [[
-        float(data['hours_slept']),
-        float(data['screen_time']),
-        float(data['caffeine']),
-        float(data['stress_level'])
-    ]]
-    return round(model.predict(features)[0], 2)
+    return predict_sleep_scores([data])[0]
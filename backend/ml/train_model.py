@@ -1,14 +1,151 @@
-import pandas as pd
+# ml/train_model.py
+#
+# Trains the sleep score model and stores it as a new version in ml/models (see model_store.py).
+#
+#   cd backend && python -m ml.train_model                                # the bundled sample CSV
+#   cd backend && python -m ml.train_model --source exports/logs.ndjson --max-rows 2000000
+#   cd backend && python -m ml.train_model --source firestore --activate
+#
+# Every run with the same source and --seed picks the same hyperparameters and produces the
+# same model. Among candidates whose cross-validated error is within --mae-tolerance of the
+# best, the smallest forest wins, since size drives load time and latency. Holdout error, artifact size and latency go into the version's meta.json; the
+# full search results and a side-by-side with the active version go into its report.json.
+
+import argparse
+import os
+import time
+
+import numpy as np
 from sklearn.ensemble import RandomForestRegressor
-import joblib
+from sklearn.model_selection import KFold, RandomizedSearchCV, train_test_split
+
+from ml import model_store
+from ml.compact_forest import CompactForest
+from ml.training_data import iter_chunks, load_sample
+
+# Bounded forests only, so every candidate flattens into a small, shallow CompactForest
+PARAM_SPACE = {
+    "n_estimators": [25, 50, 100],
+    "max_depth": [4, 6, 8, 10, 12],
+    "min_samples_leaf": [1, 2, 4, 8],
+    "max_features": [1.0, 0.75, 0.5],
+}
+
+
+def _size_bound(params):
+    # Upper bound on leaves across the forest; a proxy for artifact size and traversal cost
+    return params["n_estimators"] * 2 ** params["max_depth"] / params["min_samples_leaf"]
+
+
+def search(X, y, args):
+    def cheapest_within_tolerance(results):
+        maes = -results["mean_test_score"]
+        allowed = maes <= maes.min() * (1 + args.mae_tolerance)
+        return min(np.flatnonzero(allowed), key=lambda i: (_size_bound(results["params"][i]), maes[i]))
+
+    # Candidates run in parallel (n_jobs); each forest stays single-threaded so cores are
+    # not oversubscribed, and fixed seeds make the result independent of the core count
+    searcher = RandomizedSearchCV(
+        RandomForestRegressor(random_state=args.seed),
+        PARAM_SPACE,
+        n_iter=args.search_iter,
+        cv=KFold(args.cv, shuffle=True, random_state=args.seed),
+        scoring="neg_mean_absolute_error",
+        n_jobs=args.n_jobs,
+        random_state=args.seed,
+        refit=cheapest_within_tolerance,
+    )
+    searcher.fit(X, y)
+    results = searcher.cv_results_
+    candidates = sorted(
+        ({
+            "chosen": bool(i == searcher.best_index_),
+            "params": params,
+            "cv_mae": round(float(-mean), 3),
+            "cv_mae_std": round(float(std), 3),
+            "fit_seconds": round(float(fit), 3),
+        } for i, (params, mean, std, fit) in enumerate(zip(results["params"], results["mean_test_score"],
+                                                           results["std_test_score"], results["mean_fit_time"]))),
+        key=lambda c: c["cv_mae"],
+    )
+    return searcher.best_estimator_, candidates, next(c for c in candidates if c["chosen"])
+
+
+def compare_with_active(X_test, y_test):
+    try:
+        version = model_store.active_version()
+        model = model_store.load_version(version)
+    except (LookupError, OSError):
+        return None
+    # Measured again here so both versions' numbers come from the same machine and holdout.
+    # The active version may have been trained on some of these rows, which flatters it.
+    return {
+        "version": version,
+        "holdout": model_store.holdout_metrics(model, X_test, y_test),
+        "artifact_bytes": os.path.getsize(os.path.join(model_store.version_dir(version), model_store.MODEL_FILE)),
+        **model_store.measure_artifact(os.path.join(model_store.version_dir(version), model_store.MODEL_FILE)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and register a sleep score model")
+    parser.add_argument("--source", default="ml/sample_sleep_data.csv",
+                        help=".csv, .ndjson/.jsonl file, or 'firestore'")
+    parser.add_argument("--chunksize", type=int, default=10000, help="rows read per chunk")
+    parser.add_argument("--max-rows", type=int, help="train on a seeded uniform sample of this many rows")
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction kept out to measure error")
+    parser.add_argument("--search-iter", type=int, default=20, help="hyperparameter candidates tried")
+    parser.add_argument("--cv", type=int, default=3, help="cross-validation folds per candidate")
+    parser.add_argument("--mae-tolerance", type=float, default=0.02,
+                        help="take the smallest candidate within this fraction of the best CV error")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel search workers (-1: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--activate", action="store_true", help="make the new version active")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    X, y, counts = load_sample(iter_chunks(args.source, args.chunksize), args.max_rows, args.seed)
+    load_seconds = time.perf_counter() - started
+    if counts["used"] < 10:
+        raise SystemExit(f"Only {counts['used']} usable rows in {args.source}; need at least 10")
+    print(f"Loaded {counts['used']} rows ({counts['dropped']} unusable) in {load_seconds:.1f}s")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.holdout, random_state=args.seed)
+
+    started = time.perf_counter()
+    best, candidates, chosen = search(X_train, y_train, args)
+    search_seconds = time.perf_counter() - started
+    model = CompactForest.from_sklearn(best)
+    holdout = model_store.holdout_metrics(model, X_test, y_test)
+    baseline = compare_with_active(X_test, y_test)
+
+    version = model_store.save_version(model, {
+        "source": args.source,
+        "seed": args.seed,
+        "params": chosen["params"],
+        "rows": {**counts, "train": len(y_train), "holdout": len(y_test)},
+        "holdout": holdout,
+        "cv_mae": chosen["cv_mae"],
+        "train_seconds": {"load": round(load_seconds, 2), "search": round(search_seconds, 2)},
+    }, activate=args.activate)
+    meta = model_store.read_registry()["versions"][version]
+    report_path = model_store.write_report(version, {
+        "version": version,
+        "meta": meta,
+        "search": {"n_iter": args.search_iter, "cv": args.cv, "n_jobs": args.n_jobs,
+                   "mae_tolerance": args.mae_tolerance, "candidates": candidates},
+        "previous_active": baseline,
+    })
 
-# Load and train
-data = pd.read_csv('ml/sample_sleep_data.csv')
-X = data[['hours_slept', 'screen_time', 'caffeine', 'stress_level']]
-y = data['sleep_score']
+    print(f"Search: {len(candidates)} candidates in {search_seconds:.1f}s, chose {chosen['params']} "
+          f"(cv mae {chosen['cv_mae']}, best {candidates[0]['cv_mae']})")
+    print(f"{version}: mae={holdout['mae']} rmse={holdout['rmse']} bytes={meta['artifact_bytes']} "
+          f"single_us={meta['predict_single_us_p50']}")
+    if baseline:
+        print(f"{baseline['version']} (active): mae={baseline['holdout']['mae']} rmse={baseline['holdout']['rmse']} "
+              f"bytes={baseline['artifact_bytes']} single_us={baseline['predict_single_us_p50']}")
+    state = "active" if model_store.read_registry()["active"] == version else "inactive"
+    print(f"✅ Model {version} trained and saved ({state}); report in {report_path}")
 
-model = RandomForestRegressor()
-model.fit(X, y)
-joblib.dump(model, 'ml/sleep_model.pkl')
 
-print("Model trained and saved.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# ml/training_data.py
+#
+# Streams labelled sleep logs for train_model.py in fixed-size chunks, so the training set
+# never has to be read as one in-memory file:
+#
+#   path/to/logs.csv                      pandas read_csv with chunksize
+#   path/to/logs.ndjson (or .jsonl)       one log object per line
+#   firestore                             every user's sleep_logs entries, page by page
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from ml.sleep_model import SLEEP_FEATURES
+
+LABEL = "sleep_score"
+COLUMNS = SLEEP_FEATURES + [LABEL]
+
+
+def _file_chunks(path, chunksize):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return pd.read_csv(path, chunksize=chunksize, usecols=lambda c: c in COLUMNS)
+    if extension in (".ndjson", ".jsonl"):
+        return pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    raise ValueError(f"Unsupported training data file '{path}' (expected .csv, .ndjson or .jsonl)")
+
+
+def _firestore_chunks(chunksize):
+    # Imported here so file-based training does not need Firebase credentials
+    from db.firestore import db, iter_sleep_log_pages
+
+    for user in db.collection("sleep_logs").list_documents():
+        for page in iter_sleep_log_pages(user.id, chunksize, fields=COLUMNS):
+            yield pd.DataFrame([snapshot.to_dict() for snapshot in page])
+
+
+def iter_chunks(source, chunksize=10000):
+    """Yield DataFrames of at most `chunksize` logs from a file path or "firestore"."""
+    if source == "firestore":
+        return _firestore_chunks(chunksize)
+    return _file_chunks(source, chunksize)
+
+
+def _usable_rows(frame):
+    # Missing columns, non-numeric values and NaN/inf all make a row unusable
+    values = frame.reindex(columns=COLUMNS).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    return values[np.isfinite(values).all(axis=1)]
+
+
+def load_sample(chunks, max_rows=None, seed=0):
+    """Collect (X, y, counts) from a chunk stream, keeping only the five numeric columns.
+
+    With `max_rows`, each row gets a seeded random priority and only the `max_rows` lowest
+    are kept as chunks arrive: a uniform sample of the whole stream in bounded memory,
+    identical across runs over the same source.
+    """
+    rng = np.random.default_rng(seed)
+    kept, priorities = [], np.empty(0)
+    rows_read = rows_dropped = 0
+    for frame in chunks:
+        rows = _usable_rows(frame)
+        rows_read += len(frame)
+        rows_dropped += len(frame) - len(rows)
+        if max_rows is None:
+            kept.append(rows)
+            continue
+        rows = np.concatenate(kept + [rows]) if kept else rows
+        priorities = np.concatenate([priorities, rng.random(len(rows) - len(priorities))])
+        if len(rows) > max_rows:
+            keep = np.argpartition(priorities, max_rows)[:max_rows]
+            rows, priorities = rows[keep], priorities[keep]
+        kept = [rows]
+
+    data = np.concatenate(kept) if kept else np.empty((0, len(COLUMNS)))
+    counts = {"read": rows_read, "dropped": rows_dropped, "used": len(data)}
+    return data[:, :-1], data[:, -1], counts
@@ -0,0 +1,119 @@
+# model_registry.py
+
+import gc
+import os
+import threading
+import time
+
+import metrics
+
+
+class ModelRegistry:
+    """Loads heavy models on first use instead of at import time.
+
+    Modules register a loader under a name; `get(name)` loads it once (other callers
+    block until it is ready) and `warm_up()` can preload models on a background thread.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._status = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {"state": "not_loaded"})
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            self._status[name] = {"state": "loading"}
+            started = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._status[name] = {"state": "failed", "error": str(e)}
+                raise
+            return self._ready(name, model, time.perf_counter() - started)
+
+    def _ready(self, name, model, elapsed):
+        self._models[name] = model
+        self._status[name] = {"state": "ready", "load_seconds": round(elapsed, 2)}
+        version = getattr(model, "version", None)
+        if version is not None:
+            self._status[name]["version"] = version
+        metrics.observe(f"models.load.{name}", elapsed)
+        print(f"✅ Loaded model '{name}' in {elapsed:.1f}s")
+        return model
+
+    def reload(self, name):
+        """Load a fresh copy of `name` and swap it in.
+
+        Callers keep getting the current model while the new one loads; if loading fails
+        the current model stays in place and the error is raised.
+        """
+        with self._locks[name]:
+            started = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception:
+                metrics.incr(f"models.reload_failed.{name}")
+                raise
+            return self._ready(name, model, time.perf_counter() - started)
+
+    def is_ready(self, name):
+        return name in self._models
+
+    def names(self):
+        return list(self._loaders)
+
+    def status(self):
+        return {name: dict(self._status[name]) for name in self._loaders}
+
+    def warm_up(self, names=None, background=True):
+        names = [n for n in (names or self.names()) if n in self._loaders]
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Warm-up of model '{name}' failed:", e)
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ModelRegistry()
+
+
+def warm_up_from_env():
+    mode = os.getenv("INFERENCE_MODE", "local")
+    if mode == "sidecar":
+        return None  # the inference sidecar owns the models
+    if mode == "preload":
+        # Runs in the gunicorn master (preload_app): load everything before forking and move
+        # it out of the collector's reach so workers share the pages copy-on-write
+        registry.warm_up(background=False)
+        gc.freeze()
+        return None
+
+    # MODEL_WARMUP: "" (load lazily on first use), "all", or a comma separated list of names
+    setting = os.getenv("MODEL_WARMUP", "").strip()
+    if not setting:
+        return None
+    names = None if setting == "all" else [n.strip() for n in setting.split(",") if n.strip()]
+    return registry.warm_up(names)
@@ -0,0 +1,54 @@
+# rescore_history.py
+#
+# Rescores stored sleep logs with the current sleep model (e.g. after retraining), rewriting
+# sleep_score in place with batched writes and rebuilding each user's stats and rollups.
+#
+#   cd backend && python rescore_history.py              # every user with sleep logs
+#   cd backend && python rescore_history.py --user UID
+#   cd backend && python rescore_history.py --fallback-only   # users with logs /log could not score
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from db.firestore import db
+from ml.rescore import rescore_user_history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore stored sleep logs with the current model")
+    parser.add_argument("--user", action="append", help="only this user id (repeatable)")
+    parser.add_argument("--fallback-only", action="store_true",
+                        help="only users with logs stored without a score (sleep_score_fallback)")
+    parser.add_argument("--workers", type=int, default=4, help="users rescored in parallel")
+    args = parser.parse_args()
+
+    if args.user:
+        user_ids = args.user
+    elif args.fallback_only:
+        # sleep_logs/{uid}/entries/{id}: the user is the entry's grandparent
+        flagged = db.collection_group("entries").where("sleep_score_fallback", "==", True).select([]).stream()
+        user_ids = sorted({snapshot.reference.parent.parent.id for snapshot in flagged})
+    else:
+        user_ids = [ref.id for ref in db.collection("sleep_logs").list_documents()]
+    print(f"Rescoring {len(user_ids)} user(s)")
+
+    def rescore(user_id):
+        try:
+            return user_id, rescore_user_history(user_id), None
+        except Exception as e:
+            return user_id, None, e
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for i, (user_id, result, error) in enumerate(pool.map(rescore, user_ids), 1):
+            if error is not None:
+                failed += 1
+                print(f"❌ [{i}/{len(user_ids)}] {user_id}: {error}")
+            else:
+                print(f"✅ [{i}/{len(user_ids)}] {user_id}: {result['updated']}/{result['scanned']} logs updated")
+    if failed:
+        raise SystemExit(f"{failed} user(s) failed; re-run with --user for each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# tests/fake_firestore.py
+#
+# In-memory stand-in for the parts of the Firestore client the backend uses: documents,
+# collection queries (where / order_by / select / start_after / limit / count), batches,
+# transactions and get_all. Used by the tests and by benchmarks/offline_app.py; queries
+# follow Firestore's semantics closely enough for both, not exhaustively.
+
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import firebase_admin
+import google.auth.credentials
+from firebase_admin import credentials
+from google.cloud.firestore_v1.transforms import DELETE_FIELD, SERVER_TIMESTAMP, Increment
+
+DOCUMENT_ID = "__name__"
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+def _resolve(current, value):
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, Increment):
+        return (current or 0) + value.value
+    return copy.deepcopy(value)
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        return self._data.get(field) if self._data else None
+
+
+class FakeDocument:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+    def get(self, transaction=None, **kwargs):
+        return FakeSnapshot(self, self._client._read(self.path))
+
+    def set(self, data, merge=False):
+        self._client._apply([("set", self.path, data, merge)])
+
+    def update(self, data):
+        self._client._apply([("update", self.path, data, True)])
+
+    def delete(self):
+        self._client._apply([("delete", self.path, None, False)])
+
+
+class FakeAggregation:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeCountQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def get(self, **kwargs):
+        return [[FakeAggregation(sum(1 for _ in self._query.stream()))]]
+
+
+class FakeQuery:
+    def __init__(self, client, path, filters=(), orders=(), fields=None, cursor=None, limit=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._fields = fields
+        self._cursor = cursor
+        self._limit = limit
+
+    def _copy(self, **changes):
+        state = {"filters": self._filters, "orders": self._orders, "fields": self._fields,
+                 "cursor": self._cursor, "limit": self._limit, **changes}
+        return FakeQuery(self._client, self._path, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((str(field), direction),))
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, values):
+        if isinstance(values, FakeSnapshot):
+            values = {**values.to_dict(), DOCUMENT_ID: values.id}
+        return self._copy(cursor=dict(values))
+
+    def count(self):
+        return FakeCountQuery(self)
+
+    def _matches(self, doc_id, data):
+        for field, op, value in self._filters:
+            if field not in data or not _OPERATORS[op](data[field], value):
+                return False
+        # Like Firestore, ordering by a field leaves out documents without it
+        return all(field == DOCUMENT_ID or field in data for field, _ in self._orders)
+
+    def _after_cursor(self, doc_id, data):
+        # The cursor may name only a prefix of the order fields (e.g. a bare timestamp)
+        for field, direction in self._orders:
+            if field not in self._cursor:
+                break
+            value = doc_id if field == DOCUMENT_ID else data[field]
+            if value != self._cursor[field]:
+                return value > self._cursor[field] if direction == "ASCENDING" else value < self._cursor[field]
+        return False
+
+    def stream(self, transaction=None, **kwargs):
+        docs = [(doc_id, data) for doc_id, data in self._client._children(self._path)
+                if self._matches(doc_id, data)]
+        # Firestore breaks remaining ties by document id, ascending
+        docs.sort(key=lambda item: item[0])
+        for field, direction in reversed(self._orders):
+            docs.sort(key=lambda item: item[0] if field == DOCUMENT_ID else item[1][field],
+                      reverse=direction == "DESCENDING")
+        if self._cursor is not None:
+            docs = [(doc_id, data) for doc_id, data in docs if self._after_cursor(doc_id, data)]
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        for doc_id, data in docs:
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            yield FakeSnapshot(FakeDocument(self._client, f"{self._path}/{doc_id}"), data)
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id=None):
+        return FakeDocument(self._client, f"{self._path}/{doc_id or uuid.uuid4().hex[:20]}")
+
+    def list_documents(self):
+        return [self.document(doc_id) for doc_id, _ in self._client._children(self._path)]
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, ref, data, merge=False):
+        self._writes.append(("set", ref.path, data, merge))
+
+    def update(self, ref, data):
+        self._writes.append(("update", ref.path, data, True))
+
+    def delete(self, ref):
+        self._writes.append(("delete", ref.path, None, False))
+
+    def commit(self):
+        self._client._apply(self._writes)
+        self._client.commits += 1
+        self._writes = []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Buffers writes until commit; satisfies firestore.transactional's retry loop.
+
+    Reads are not isolated, and a transaction is never retried.
+    """
+
+    _read_only = False
+    _max_attempts = 1
+    _id = None
+
+    def _clean_up(self):
+        self._writes = []
+
+    def _begin(self, retry_id=None):
+        self._writes = []
+
+    def _commit(self):
+        self.commit()
+
+    def _rollback(self):
+        self._writes = []
+
+
+class FakeClient:
+    def __init__(self):
+        self._docs = {}  # document path -> data
+        self._lock = threading.Lock()
+        self.commits = 0  # batches and transactions committed
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def document(self, path):
+        return FakeDocument(self, path)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def get_all(self, refs, transaction=None, **kwargs):
+        for ref in refs:
+            yield ref.get()
+
+    def _read(self, path):
+        with self._lock:
+            return copy.deepcopy(self._docs.get(path))
+
+    def _children(self, collection_path):
+        prefix = collection_path + "/"
+        with self._lock:
+            return [(path[len(prefix):], copy.deepcopy(data)) for path, data in self._docs.items()
+                    if path.startswith(prefix) and "/" not in path[len(prefix):]]
+
+    def _apply(self, writes):
+        with self._lock:
+            for op, path, data, merge in writes:
+                if op == "delete":
+                    self._docs.pop(path, None)
+                    continue
+                if op == "update" and path not in self._docs:
+                    raise KeyError(f"No document to update: {path}")
+                current = self._docs.get(path, {}) if merge else {}
+                doc = dict(current)
+                for field, value in data.items():
+                    if value is DELETE_FIELD:
+                        doc.pop(field, None)
+                    else:
+                        doc[field] = _resolve(current.get(field), value)
+                self._docs[path] = doc
+
+
+class _AnonymousCredential(credentials.Base):
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+
+def initialize_app():
+    """Initialize firebase_admin without a service account.
+
+    Must run before db.firestore is imported; firebase_admin_init then leaves the app
+    alone, and the real clients it builds are never sent a request once replaced by fakes.
+    """
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(_AnonymousCredential(), {"projectId": "sleepwell-fake"})
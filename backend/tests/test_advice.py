@@ -0,0 +1,27 @@
+import pytest
+
+from ai.advice_generator import parse_advice
+
+
+@pytest.mark.parametrize("output", [
+    "ROUTINE:\n- Go to bed at 10 every night\n- Stop caffeine after 2 PM\n"
+    "TIPS:\n1. Keep the bedroom cool and dark\n2. Put the phone away an hour before bed",
+    # Section text on the marker line, numbered and bulleted items, a leading preamble
+    "Here is your plan.\nROUTINE: Go to bed at 10 every night\n* Stop caffeine after 2 PM\n"
+    "Tips: Keep the bedroom cool and dark\n• Put the phone away an hour before bed",
+])
+def test_sections(output):
+    routine, tips = parse_advice(output)
+    assert routine == ["Go to bed at 10 every night", "Stop caffeine after 2 PM"]
+    assert tips == ["Keep the bedroom cool and dark", "Put the phone away an hour before bed"]
+
+
+def test_at_most_three_items_and_short_lines_dropped():
+    output = "TIPS: Keep a consistent wake time\n- ok\n" + "".join(f"- Tip number {i} is long enough\n" for i in range(5))
+    routine, tips = parse_advice(output)
+    assert routine == []
+    assert tips == ["Keep a consistent wake time", "Tip number 0 is long enough", "Tip number 1 is long enough"]
+
+
+def test_no_markers():
+    assert parse_advice("Sleep more and drink less coffee, that is all.") == ([], [])
@@ -0,0 +1,79 @@
+import io
+
+import pytest
+from PIL import Image
+
+import auth
+
+
+@pytest.fixture
+def client(fake_db, monkeypatch):
+    import app as app_module
+
+    def failing_model(data):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(app_module, "detect_stress", lambda image: {
+        "emotion": "neutral", "stress_level_numeric": 20, "stress_level_label": "Low"})
+    monkeypatch.setattr(app_module, "analyze_sentiment", lambda text: {"mood": "Neutral", "polarity": 0.0})
+    monkeypatch.setattr(app_module, "generate_tips_and_routine", lambda data: ("Go to bed earlier", ["Tip"]))
+    monkeypatch.setattr(app_module, "predict_sleep_score", failing_model)
+    monkeypatch.setattr(auth, "verify_id_token", lambda token: {"uid": token, "exp": 2 ** 40})
+    monkeypatch.setattr(auth, "METRICS_TOKEN", "scrape-secret")
+    return app_module.app.test_client()
+
+
+def _form():
+    image = io.BytesIO()
+    Image.new("RGB", (32, 32), "gray").save(image, "JPEG")
+    image.seek(0)
+    return {"journal": "Slept badly", "hours_slept": "6", "stress_level": "5", "caffeine": "2",
+            "screen_time": "3", "image": (image, "face.jpg")}
+
+
+def test_fallback_score_is_flagged_not_stored(client, fake_db, monkeypatch):
+    response = client.post("/log", data=_form(), headers={"Authorization": "Bearer u1"})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["sleep_score_fallback"] is True
+    assert "pipeline" not in body
+
+    (entry,) = fake_db.collection("sleep_logs/u1/entries").stream()
+    assert entry.to_dict()["sleep_score"] is None
+    assert entry.to_dict()["sleep_score_fallback"] is True
+    stats = fake_db.document("sleep_stats/u1").get().to_dict()
+    assert stats["entry_count"] == 1 and stats["scored_count"] == 0 and stats["score_sum"] == 0
+    day = next(fake_db.collection("sleep_rollups/u1/days").stream()).to_dict()
+    assert "score" not in day["means"]
+
+    # Rescoring fills the score in and clears the flag
+    from ml import rescore
+    monkeypatch.setattr(rescore, "predict_sleep_scores", lambda rows: [64.0] * len(rows))
+    assert rescore.rescore_user_history("u1")["updated"] == 1
+    (entry,) = fake_db.collection("sleep_logs/u1/entries").stream()
+    assert entry.to_dict()["sleep_score"] == 64.0 and "sleep_score_fallback" not in entry.to_dict()
+    assert fake_db.document("sleep_stats/u1").get().to_dict()["score_sum"] == 64.0
+
+
+def test_pipeline_report_needs_metrics_token(client):
+    assert "pipeline" not in client.post("/analyze", data=_form()).get_json()
+    body = client.post("/analyze", data=_form(), headers={"Authorization": "Bearer scrape-secret"}).get_json()
+    assert body["pipeline"]["failed"] == ["sleep_score"]
+    body = client.post("/log", data=_form(), headers={"Authorization": "Bearer u1",
+                                                       "X-Metrics-Token": "scrape-secret"}).get_json()
+    assert "pipeline" in body
+
+
+def test_oversized_upload_rejected_before_parsing(client, monkeypatch):
+    import app as app_module
+
+    def unexpected(image):
+        raise AssertionError("the form should not have been read")
+
+    monkeypatch.setattr(app_module, "ANALYSIS_MAX_REQUEST_BYTES", 1024)
+    monkeypatch.setattr(app_module, "read_image_upload", unexpected)
+    def form():
+        return {**_form(), "image": (io.BytesIO(b"\xff" * 4096), "face.jpg")}
+
+    assert client.post("/analyze", data=form()).status_code == 413
+    assert client.post("/log", data=form(), headers={"Authorization": "Bearer u1"}).status_code == 413
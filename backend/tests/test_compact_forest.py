@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from ml.compact_forest import CompactForest
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 12, size=(400, 4))
+    y = 60 + 4 * X[:, 0] - 3 * X[:, 1] + rng.normal(0, 5, size=400)
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    RandomForestRegressor(n_estimators=20, random_state=42),
+    DecisionTreeRegressor(max_depth=6, random_state=42),
+])
+def test_predict_matches_sklearn(data, model):
+    X, y = data
+    model.fit(X[:300], y[:300])
+    forest = CompactForest.from_sklearn(model)
+    np.testing.assert_allclose(forest.predict(X[300:]), model.predict(X[300:]), rtol=0, atol=1e-9)
+
+
+def test_save_load_round_trip(data, tmp_path):
+    X, y = data
+    forest = CompactForest.from_sklearn(RandomForestRegressor(n_estimators=10, random_state=42).fit(X, y))
+    path = tmp_path / "forest.npz"
+    forest.save(path)
+    loaded = CompactForest.load(path)
+    assert (loaded.n_trees, loaded.n_nodes, loaded.max_depth, loaded.n_features) == \
+        (forest.n_trees, forest.n_nodes, forest.max_depth, forest.n_features)
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
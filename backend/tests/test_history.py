@@ -0,0 +1,68 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from db.firestore import get_sleep_logs_page
+
+
+@pytest.fixture(scope="module")
+def parse_history_args():
+    from app import parse_history_args
+    return parse_history_args
+
+
+def test_parse_modes(parse_history_args):
+    assert parse_history_args(MultiDict({"count_only": "1", "since": "2026-01-01"})) == \
+        ("count", {"since": "2026-01-01", "until": None})
+    mode, query = parse_history_args(MultiDict({"fields": "sleep_score, timestamp", "order": "desc"}))
+    assert mode == "all"
+    assert query["fields"] == ["sleep_score", "timestamp"] and query["descending"] is True
+    mode, query = parse_history_args(MultiDict({"start_after": "2026-01-01T07:00:00|abc"}))
+    assert mode == "page" and query["limit"] == 50 and query["start_after"] == "2026-01-01T07:00:00|abc"
+    assert parse_history_args(MultiDict({"limit": "100000"}))[1]["limit"] == 500
+
+
+@pytest.mark.parametrize("args, message", [
+    ({"fields": "sleep_score,password"}, "unknown fields: password"),
+    ({"limit": "ten"}, "limit must be an integer"),
+    ({"limit": "0"}, "limit must be positive"),
+])
+def test_parse_rejects(parse_history_args, args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_history_args(MultiDict(args))
+
+
+def _add_entries(client, user_id, entries):
+    for doc_id, timestamp, score in entries:
+        client.document(f"sleep_logs/{user_id}/entries/{doc_id}").set(
+            {"timestamp": timestamp, "sleep_score": score, "hours_slept": 7})
+
+
+def _all_pages(user_id, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = get_sleep_logs_page(user_id, limit, start_after=cursor, fields=["sleep_score"], **kwargs)
+        pages.append([row["sleep_score"] for row in page["logs"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_cursor_breaks_timestamp_ties_by_document_id(fake_db, descending):
+    # Four entries share a timestamp and straddle the page boundaries
+    same = "2026-03-02T07:00:00"
+    _add_entries(fake_db, "u1", [("a", "2026-03-01T07:00:00", 1.0), ("b", same, 2.0), ("c", same, 3.0),
+                                 ("d", same, 4.0), ("e", same, 5.0), ("f", "2026-03-03T07:00:00", 6.0)])
+    pages = _all_pages("u1", 2, descending=descending)
+    expected = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert [score for page in pages for score in page] == (expected[::-1] if descending else expected)
+    assert [len(page) for page in pages] == [2, 2, 2]
+
+
+def test_cursor_format_and_bare_timestamp(fake_db):
+    _add_entries(fake_db, "u1", [("a", "2026-03-01T07:00:00", 1.0), ("b", "2026-03-02T07:00:00", 2.0),
+                                 ("c", "2026-03-02T07:00:00", 3.0)])
+    assert get_sleep_logs_page("u1", 2)["next_cursor"] == "2026-03-02T07:00:00|b"
+    # A bare timestamp from an older client resumes after every entry at that time
+    page = get_sleep_logs_page("u1", 2, start_after="2026-03-01T07:00:00", fields=["sleep_score"])
+    assert page == {"logs": [{"sleep_score": 2.0}, {"sleep_score": 3.0}], "next_cursor": None}
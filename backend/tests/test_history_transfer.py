@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from ml import history_transfer
+from ml.history_transfer import _import_doc_id, export_sleep_logs, import_sleep_logs, validate_import_row
+
+ROW = {"timestamp": "2026-03-01T07:00:00", "hours_slept": 7.5, "screen_time": 2, "caffeine": 1, "stress_level": 20}
+
+
+def test_valid_row_is_normalized():
+    log, error = validate_import_row({**ROW, "timestamp": "2026-03-01T09:00:00+02:00", "caffeine": "2",
+                                      "mood": "happy", "sleep_score": 99, "unknown": "x"})
+    assert error is None
+    assert log == {"timestamp": "2026-03-01T07:00:00", "hours_slept": 7.5, "screen_time": 2.0,
+                   "caffeine": 2.0, "stress_level": 20.0, "mood": "happy", "journal": ""}
+
+
+@pytest.mark.parametrize("row, error", [
+    (["not", "an", "object"], "row must be a JSON object"),
+    ({**ROW, "id": "../other-user"}, "'id' must be 1-128 letters, digits, '_' or '-'"),
+    ({**ROW, "timestamp": None}, "missing 'timestamp'"),
+    ({**ROW, "timestamp": "yesterday"}, "'timestamp' must be an ISO 8601 date-time"),
+    ({**ROW, "timestamp": "2999-01-01T00:00:00"}, "'timestamp' is in the future"),
+    ({k: v for k, v in ROW.items() if k != "caffeine"}, "missing 'caffeine'"),
+    ({**ROW, "stress_level": "high"}, "'stress_level' must be a number"),
+    ({**ROW, "caffeine": float("nan")}, "'caffeine' must be a non-negative number"),
+    ({**ROW, "hours_slept": 25}, "'hours_slept' and 'screen_time' must be at most 24"),
+    ({**ROW, "journal": "x" * 10001}, "'journal' is longer than 10000 characters"),
+])
+def test_invalid_rows(row, error):
+    assert validate_import_row(row) == (None, error)
+
+
+def test_import_doc_id():
+    log, _ = validate_import_row(ROW)
+    assert _import_doc_id({**ROW, "id": "abc"}, log) == "abc"
+    # Without an id the entry is keyed by its timestamp, however the timestamp was written
+    same, _ = validate_import_row({**ROW, "timestamp": "2026-03-01T07:00:00Z"})
+    assert _import_doc_id(ROW, log) == _import_doc_id(ROW, same)
+    assert _import_doc_id(ROW, log).startswith("import-")
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    monkeypatch.setattr(history_transfer, "predict_sleep_scores", lambda logs: [70.0] * len(logs))
+
+
+def _write_ndjson(path, rows):
+    path.write_text("".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows))
+    return str(path)
+
+
+def test_import_skips_invalid_and_duplicate_rows(fake_db, scored, tmp_path):
+    rows = [ROW, {**ROW, "timestamp": "2026-03-01T07:00:00Z"}, "{broken", {**ROW, "id": "x1"},
+            {**ROW, "id": "x1", "hours_slept": 9}, {**ROW, "timestamp": "2026-03-02T07:00:00"}]
+    result = import_sleep_logs("u1", _write_ndjson(tmp_path / "logs.ndjson", rows), "ndjson")
+
+    assert (result["imported"], result["invalid"], result["duplicates"]) == (3, 1, 2)
+    assert result["errors"] == [{"row": 2, "error": "duplicate of row 1"},
+                                {"row": 3, "error": "row must be a JSON object"},
+                                {"row": 5, "error": "duplicate of row 4"}]
+    assert result["entry_count"] == 3
+    assert not (tmp_path / "logs.ndjson").exists()
+    assert fake_db.document("sleep_logs/u1/entries/x1").get().to_dict()["hours_slept"] == 7.5
+
+
+def test_reimporting_an_export_does_not_duplicate(fake_db, scored, tmp_path):
+    import_sleep_logs("u1", _write_ndjson(tmp_path / "first.ndjson",
+                                          [ROW, {**ROW, "timestamp": "2026-03-02T07:00:00"}]), "ndjson")
+    exported = "".join(export_sleep_logs("u1", "ndjson"))
+    (tmp_path / "export.ndjson").write_text(exported)
+
+    result = import_sleep_logs("u1", str(tmp_path / "export.ndjson"), "ndjson")
+    assert result["imported"] == 2 and result["entry_count"] == 2
@@ -0,0 +1,44 @@
+import time
+
+from db.firestore import FirestoreJobStore
+from jobs import JobQueue
+
+
+def _wait(queue, job_id, owner):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = queue.get(job_id, owner=owner)
+        if job and job["state"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def _double(value, timings):
+    timings["work"] = 1.0
+    return {"value": value * 2}
+
+
+def test_status_is_readable_from_another_worker(fake_db):
+    # Two queues with the same name stand in for the same route in two gunicorn workers
+    accepting = JobQueue("voice_jobs", workers=1, store=FirestoreJobStore())
+    polled = JobQueue("voice_jobs", workers=1, store=FirestoreJobStore())
+
+    job_id = accepting.submit(_double, 21, owner="u1")
+    job = _wait(polled, job_id, "u1")
+    assert job["state"] == "done"
+    assert job["result"] == {"value": 42}
+    assert job["timings_ms"] == {"work": 1.0}
+    assert "owner" not in job and "expires_at" not in job
+
+    assert polled.get(job_id, owner="u2") is None
+    assert JobQueue("rescore_jobs", store=FirestoreJobStore()).get(job_id, owner="u1") is None
+
+
+def test_failed_job_reports_error(fake_db):
+    def fail(timings):
+        raise RuntimeError("Transcription failed")
+
+    queue = JobQueue("voice_jobs", workers=1, store=FirestoreJobStore())
+    job = _wait(queue, queue.submit(fail, owner="u1"), "u1")
+    assert job["state"] == "failed" and job["error"] == "Transcription failed"
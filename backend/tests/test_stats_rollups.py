@@ -0,0 +1,75 @@
+from db.firestore import UserWriteBatch, _empty_sleep_stats, apply_log_to_stats, rebuild_rollups
+
+
+def _log(timestamp, score=80.0, hours=8.0, **extra):
+    return {"hours_slept": hours, "caffeine": 1, "screen_time": 2, "stress_level": 20,
+            "sleep_score": score, "timestamp": timestamp, **extra}
+
+
+def _stats(*logs):
+    stats = _empty_sleep_stats()
+    for log in logs:
+        apply_log_to_stats(stats, log)
+    return stats
+
+
+def test_sums_and_maxima():
+    stats = _stats(_log("2026-03-01T07:00:00", score=70.0, hours=6.0),
+                   _log("2026-03-02T07:00:00", score=90.0, hours=8.5))
+    assert stats["entry_count"] == 2 and stats["scored_count"] == 2
+    assert stats["score_sum"] == 160.0 and stats["hours_sum"] == 14.5
+    assert stats["max_score"] == 90.0 and stats["max_hours"] == 8.5
+    assert stats["last_timestamp"] == "2026-03-02T07:00:00"
+
+
+def test_unscored_log_counts_but_is_not_averaged():
+    stats = _stats(_log("2026-03-01T07:00:00", score=None))
+    assert stats["entry_count"] == 1
+    assert stats["scored_count"] == 0 and stats["score_sum"] == 0.0 and stats["max_score"] == 0.0
+
+
+def test_streak_counts_consecutive_days():
+    stats = _stats(*(_log(f"2026-03-0{day}T07:00:00") for day in (1, 2, 2, 3)))
+    assert stats["current_streak"] == 3
+    # A gap starts over, and a log older than the latest leaves the streak alone
+    apply_log_to_stats(stats, _log("2026-03-05T07:00:00"))
+    assert stats["current_streak"] == 1
+    apply_log_to_stats(stats, _log("2026-03-04T07:00:00"))
+    assert stats["current_streak"] == 1 and stats["last_log_date"] == "2026-03-05"
+    assert stats["entry_count"] == 6
+
+
+def test_log_without_timestamp_only_updates_sums():
+    stats = _stats(_log(None))
+    assert stats["entry_count"] == 1 and stats["current_streak"] == 0 and stats["last_log_date"] is None
+
+
+def _rollup_docs(client, user_id):
+    return {f"{period}/{doc.id}": doc.to_dict()
+            for period in ("days", "weeks")
+            for doc in client.collection(f"sleep_rollups/{user_id}/{period}").stream()}
+
+
+def test_rebuild_matches_incremental_rollups(fake_db):
+    logs = [_log("2026-03-01T07:00:00", score=70.0, mood="Tired"),
+            _log("2026-03-02T06:30:00", score=80.0, wakeup="06:30", mood="happy"),
+            _log("2026-03-02T22:00:00", score=None, latemeal="yes"),
+            _log("2026-03-09T07:00:00", score=90.0, caffeinetime="15:00")]
+    for log in logs:
+        batch = UserWriteBatch("u1")
+        batch.add_sleep_log(log)
+        batch.commit()
+    incremental = _rollup_docs(fake_db, "u1")
+
+    # A stale rollup with no entries behind it is removed by the rebuild
+    fake_db.document("sleep_rollups/u1/days/2026-02-01").set({"count": 3})
+    assert rebuild_rollups("u1") == {"day": 3, "week": 3}
+    assert _rollup_docs(fake_db, "u1") == incremental
+
+    day = incremental["days/2026-03-02"]
+    assert day["count"] == 2
+    assert day["means"]["score"] == 80.0 and day["counts"]["score"] == 1
+    assert day["means"]["wake"] == 6.5 and day["means"]["late_meal"] == 1.0
+    assert day["mood_counts"] == {"happy": 1}
+    assert incremental["weeks/2026-W10"]["count"] == 2
+    assert incremental["weeks/2026-W09"]["dominant_mood"] == "tired"
@@ -0,0 +1,81 @@
+from db import firestore as db_firestore
+from db.firestore import UserWriteBatch, award_xp, store_sleep_log
+
+
+def _log(day, score=80.0):
+    return {"hours_slept": 8, "caffeine": 1, "screen_time": 2, "stress_level": 20,
+            "sleep_score": score, "timestamp": f"2026-03-{day:02d}T07:00:00"}
+
+
+def _commit_log(user_id, log):
+    batch = UserWriteBatch(user_id)
+    batch.add_sleep_log(log)
+    award_xp(user_id, 25, batch=batch)
+    batch.complete_quest("log_sleep_once", when=lambda stats: stats["entry_count"] >= 1)
+    batch.complete_quest("log_3_nights", when=lambda stats: stats["current_streak"] >= 3)
+    return batch.commit()
+
+
+def test_commit_user_batch_with_fake_transaction(fake_db):
+    batch = UserWriteBatch("u1")
+    batch.add_sleep_log(_log(1))
+    stats, completed = db_firestore._commit_user_batch.to_wrap(fake_db.transaction(), batch)
+    assert stats["entry_count"] == 1
+    assert completed == []
+
+
+def test_commit_writes_log_stats_rollups_and_quests(fake_db):
+    for day in (1, 2, 3):
+        batch = _commit_log("u1", _log(day, score=70.0 + day))
+
+    assert batch.stats["entry_count"] == 3
+    assert batch.stats["current_streak"] == 3
+    assert batch.completed_quests == ["log_3_nights"]
+    assert fake_db.commits == 3
+
+    entries = list(fake_db.collection("sleep_logs").document("u1").collection("entries").stream())
+    assert sorted(e.to_dict()["sleep_score"] for e in entries) == [71.0, 72.0, 73.0]
+    assert fake_db.document("sleep_stats/u1").get().to_dict() == batch.stats
+    user = fake_db.document("users/u1").get().to_dict()
+    assert user["current_streak"] == 3
+    # 3 logs x 25 XP plus both quests, each counted once
+    quests = {q.id: q.to_dict() for q in fake_db.collection("users/u1/quests").stream()}
+    assert set(quests) == {"log_sleep_once", "log_3_nights"}
+    assert user["xp"] == 75 + sum(q["xp"] for q in quests.values())
+
+    day = fake_db.document("sleep_rollups/u1/days/2026-03-02").get().to_dict()
+    assert day["count"] == 1 and day["means"]["score"] == 72.0
+    # 2026-03-01 is a Sunday, so the next two days start ISO week 10
+    week = fake_db.document("sleep_rollups/u1/weeks/2026-W10").get().to_dict()
+    assert week["count"] == 2
+
+
+def test_store_sleep_log_without_batch(fake_db):
+    stats = store_sleep_log("u2", {"hours_slept": "7", "caffeine": "0", "screen_time": "1",
+                                   "stress_level": "10", "sleep_score": 88})
+    assert stats["entry_count"] == 1 and stats["score_sum"] == 88.0
+    assert fake_db.document("sleep_stats/u2").get().exists
+
+
+def test_batch_without_log_sums_xp_and_completes_quests_once(fake_db):
+    from db.firestore import mark_quest_completed, save_tip_feedback
+
+    batch = UserWriteBatch("u3")
+    save_tip_feedback("u3", "Dim the lights", "helpful", batch=batch)
+    award_xp("u3", 10, batch=batch)
+    award_xp("u3", 5, batch=batch)
+    mark_quest_completed("u3", "complete_voice_journal", batch=batch)
+    mark_quest_completed("u3", "complete_voice_journal", batch=batch)
+    batch.commit()
+
+    assert batch.stats is None
+    assert batch.completed_quests == ["complete_voice_journal"]
+    assert fake_db.commits == 1
+    (feedback,) = fake_db.collection("tip_feedback/u3/entries").stream()
+    assert feedback.to_dict()["tip"] == "Dim the lights"
+    quest_xp = fake_db.document("users/u3/quests/complete_voice_journal").get().to_dict()["xp"]
+    assert fake_db.document("users/u3").get().to_dict()["xp"] == 15 + quest_xp
+
+    # Already completed: no second award
+    assert mark_quest_completed("u3", "complete_voice_journal") is False
+    assert fake_db.document("users/u3").get().to_dict()["xp"] == 15 + quest_xp